@@ -0,0 +1,102 @@
+# ASGI entry point: /chat and /chat/batch run on the event loop through ChatBotLangchain.aget_response,
+# so one worker can hold many conversations in flight. Everything else is the Flask app.
+# Run with: uvicorn asgi:app --host 0.0.0.0 --port $PORT
+import asyncio
+import json
+
+from asgiref.wsgi import WsgiToAsgi
+
+import startup
+import telemetry
+from web import app as flask_app, batch_request, chatbot_class, get_session
+
+flask_asgi = WsgiToAsgi(flask_app)
+
+
+async def _send_json(send, payload: dict, status: int = 200):
+    body = json.dumps(payload).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    trace_id = telemetry.current_trace_id()
+    if trace_id:
+        headers.append((b"x-trace-id", trace_id.encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_json(receive) -> dict:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    return json.loads(body or b"{}")
+
+
+async def traced(handler, scope, receive, send):
+    request_id = dict(scope["headers"]).get(b"x-request-id", b"").decode() or None
+    _, token = telemetry.start_trace(request_id)
+    try:
+        await handler(receive, send)
+    finally:
+        telemetry.end_trace(token, scope["path"])
+
+
+async def chat(receive, send):
+    try:
+        data = await _read_json(receive)
+    except ValueError:
+        return await _send_json(send, {'error': 'Invalid JSON'}, 400)
+
+    message = data.get('message', '')
+    user_id = data.get('user_id', '')
+    if not user_id:
+        return await _send_json(send, {'error': 'User ID is required'}, 400)
+
+    # session lookup may restore a spilled conversation from disk
+    chatbot = await asyncio.to_thread(get_session, user_id)
+    if not message:
+        return await _send_json(send, {'error': 'Empty message'}, 400)
+
+    response = await chatbot.aget_response(message, user_id)
+    await _send_json(send, {'response': response})
+
+
+async def chat_batch(receive, send):
+    # many (user_id, message) pairs in one request, one JSON line per answer as they finish
+    try:
+        data = await _read_json(receive)
+    except ValueError:
+        return await _send_json(send, {'error': 'Invalid JSON'}, 400)
+    items, max_concurrency, error = batch_request(data)
+    if error:
+        return await _send_json(send, {'error': error}, 400)
+
+    headers = [(b"content-type", b"application/x-ndjson")]
+    if telemetry.current_trace_id():
+        headers.append((b"x-trace-id", telemetry.current_trace_id().encode()))
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    # the first chat of a process imports chatbot, not on the event loop
+    chatbot = await asyncio.to_thread(chatbot_class)
+    async for result in chatbot.abatch_responses(items, get_session, max_concurrency):
+        await send({"type": "http.response.body", "body": (json.dumps(result) + "\n").encode(), "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # uvicorn starts listening right after this, the heavy imports happen in the background
+                startup.start_warm_up()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] == "http" and scope["path"] == "/chat" and scope["method"] == "POST":
+        return await traced(chat, scope, receive, send)
+    if scope["type"] == "http" and scope["path"] == "/chat/batch" and scope["method"] == "POST":
+        return await traced(chat_batch, scope, receive, send)
+    return await flask_asgi(scope, receive, send)
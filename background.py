@@ -0,0 +1,84 @@
+# bounded worker pool for post-processing work (personal info extraction etc.)
+import queue
+import threading
+from typing import Callable, Dict
+
+from config import bot_config
+import telemetry
+
+
+class BackgroundQueue:
+    """
+    Fixed pool of worker threads fed by a bounded queue.
+
+    submit() waits up to `put_timeout` seconds for a free slot (backpressure on
+    the request thread) and drops the job when the queue stays full, so a slow
+    LLM can't pile up unbounded threads or memory.
+    """
+
+    def __init__(self, workers: int = None, max_size: int = None, put_timeout: float = None, name: str = "background"):
+        cfg = bot_config["background"]
+        self.workers = workers or cfg["workers"]
+        self.put_timeout = put_timeout if put_timeout is not None else cfg["put_timeout"]
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_size or cfg["max_queue"])
+        self.counters: Dict[str, int] = {"submitted": 0, "completed": 0, "failed": 0, "dropped": 0}
+        self._lock = threading.Lock()
+
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True).start()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> bool:
+        try:
+            self._queue.put((fn, args, kwargs), timeout=self.put_timeout)
+        except queue.Full:
+            self._count("dropped")
+            print(f"Background queue full, dropped {getattr(fn, '__name__', fn)}")
+            return False
+        self._count("submitted")
+        return True
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def join(self):
+        # wait until everything submitted so far has run
+        self._queue.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "depth": self.depth()}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counters[key] += 1
+
+    def _worker(self):
+        while True:
+            fn, args, kwargs = self._queue.get()
+            try:
+                fn(*args, **kwargs)
+                self._count("completed")
+            except Exception as e:
+                self._count("failed")
+                print(f"Background job error: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+
+_queues: Dict[str, BackgroundQueue] = {}
+_queues_lock = threading.Lock()
+
+def get_queue(name: str = "extraction") -> BackgroundQueue:
+    with _queues_lock:
+        if name not in _queues:
+            _queues[name] = BackgroundQueue(name=name)
+        return _queues[name]
+
+
+def _queue_metrics(key: str):
+    with _queues_lock:
+        queues = dict(_queues)
+    return {(("queue", name),): q.stats()[key] for name, q in queues.items()}
+
+telemetry.register_gauge("chatbot_queue_depth", "Jobs waiting in each background queue", lambda: _queue_metrics("depth"))
+telemetry.register_gauge("chatbot_queue_dropped", "Jobs dropped because a background queue was full", lambda: _queue_metrics("dropped"))
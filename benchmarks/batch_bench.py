@@ -0,0 +1,97 @@
+# Bulk answering: the same (user_id, message) pairs sent as one /chat call each (serially, and from
+# --concurrency client threads) and as a single /chat/batch request, against the stub LLM.
+# Checks every answer arrived and each user's answers came back in order.
+# usage: python benchmarks/batch_bench.py [--users 50] [--messages 4] [--concurrency 16] [--serial]
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from load_test import MESSAGES, start_servers
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--users", type=int, default=50)
+parser.add_argument("--messages", type=int, default=4, help="messages per user")
+parser.add_argument("--concurrency", type=int, default=16, help="client threads, and max_concurrency of the batch")
+parser.add_argument("--server", default="uvicorn", choices=["uvicorn", "flask"])
+parser.add_argument("--serial", action="store_true", help="also time one /chat call after another")
+parser.add_argument("--latency", type=float, default=0.1, help="stub LLM time to first token, seconds")
+parser.add_argument("--tokens-per-second", type=float, default=250)
+parser.add_argument("--tokens", type=int, default=20)
+args = parser.parse_args()
+
+# different users per run, so no run answers from another one's history
+def items(run: str) -> list:
+    return [
+        {"user_id": f"{run}-{user}", "message": MESSAGES[(user + turn) % len(MESSAGES)].format(name="Sam", city="Oslo", hobby="chess")}
+        for turn in range(args.messages) for user in range(args.users)
+    ]
+
+
+def one_by_one(url: str, batch: list, threads: int) -> float:
+    by_user = {}
+    for item in batch:
+        by_user.setdefault(item["user_id"], []).append(item)
+
+    def run_user(user_items):
+        session = requests.Session()
+        for item in user_items:
+            session.post(url + "/chat", json=item, timeout=120).raise_for_status()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(run_user, by_user.values()))
+    return time.perf_counter() - start
+
+
+def batched(url: str, batch: list) -> tuple:
+    start = time.perf_counter()
+    first = None
+    results = []
+    with requests.post(url + "/chat/batch", json={"items": batch, "max_concurrency": args.concurrency}, stream=True, timeout=600) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                first = first or time.perf_counter() - start
+                results.append(json.loads(line))
+    elapsed = time.perf_counter() - start
+
+    last_index = {}
+    out_of_order = 0
+    for result in results:
+        if result["index"] < last_index.get(result["user_id"], -1):
+            out_of_order += 1
+        last_index[result["user_id"]] = result["index"]
+    errors = sum("error" in result for result in results)
+    return elapsed, first, len(results), out_of_order, errors
+
+
+workdir = tempfile.mkdtemp()
+stub, app, _, url = start_servers(args, workdir)
+try:
+    requests.post(url + "/chat", json={"user_id": "warmup", "message": "hello"}, timeout=60)
+    total = args.users * args.messages
+    rows = []
+    if args.serial:
+        rows.append(("serial /chat", one_by_one(url, items("serial"), 1)))
+    rows.append((f"/chat x {args.concurrency} threads", one_by_one(url, items("threads"), args.concurrency)))
+    elapsed, first, received, out_of_order, errors = batched(url, items("batch"))
+    rows.append(("/chat/batch", elapsed))
+finally:
+    for proc in (app, stub):
+        proc.terminate()
+        proc.wait()
+
+print(f"{args.users} users x {args.messages} messages = {total} turns, server {args.server}, "
+      f"stub latency {args.latency * 1000:.0f} ms + {args.tokens} tokens at {args.tokens_per_second:.0f} tok/s")
+print(f"{'':>24} {'seconds':>8} {'turns/s':>8}")
+for name, seconds in rows:
+    print(f"{name:>24} {seconds:>8.2f} {total / seconds:>8.1f}")
+print(f"batch: {received}/{total} answers, first line after {first * 1000:.0f} ms, "
+      f"{out_of_order} out of per-user order, {errors} errors")
@@ -0,0 +1,83 @@
+# Chat turns per second with 1..N worker processes sharing one sqlite checkpointer,
+# the way gunicorn workers do. Model calls are faked with a fixed latency.
+# usage: python benchmarks/checkpoint_bench.py [--workers 1 2 4 8] [--turns 50] [--latency 0.05] [--backend sqlite]
+import argparse
+import itertools
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "bench")
+
+
+def worker(worker_id: int, users: int, turns: int, latency: float, backend: str, start_event, results):
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+
+    import chatbot
+    from config import bot_config
+
+    class SlowFakeModel(GenericFakeChatModel):
+        def _generate(self, *args, **kwargs):
+            time.sleep(latency)
+            return super()._generate(*args, **kwargs)
+
+    bot_config["checkpointer"]["backend"] = backend
+    chatbot.set_llm("core_llm", SlowFakeModel(messages=(f"reply {worker_id}-{i}" for i in itertools.count())))
+    chatbot.set_llm("personal_info", GenericFakeChatModel(messages=itertools.cycle(["NO PERSONAL INFORMATION"])))
+    # every turn on the fake core_llm, short ones would otherwise go to a real small_llm
+    bot_config["model_routing"]["enabled"] = False
+    sys.stdout = open(os.devnull, "w")
+
+    bots = [chatbot.ChatBotLangchain(f"w{worker_id}-u{u}") for u in range(users)]
+    start_event.wait()
+    start = time.perf_counter()
+    for turn in range(turns):
+        bot = bots[turn % users]
+        bot.get_response(f"Question {turn}: tell me something about topic {turn}", bot.user_id)
+    results.put(time.perf_counter() - start)
+
+
+def run(workers: int, args) -> float:
+    os.chdir(tempfile.mkdtemp())
+    start_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=worker, args=(w, args.users, args.turns, args.latency, args.backend, start_event, results))
+        for w in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    time.sleep(2) # imports and setup, not timed
+    start_event.set()
+    elapsed = max(results.get() for _ in procs)
+    for proc in procs:
+        proc.join()
+
+    db_size = 0
+    rows = 0
+    if args.backend == "sqlite":
+        db_size = sum(os.path.getsize(f) for f in os.listdir() if f.startswith("checkpoints.db"))
+        rows = sqlite3.connect("checkpoints.db").execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+    return workers * args.turns / elapsed, rows, db_size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--turns", type=int, default=50, help="turns per worker")
+    parser.add_argument("--users", type=int, default=5, help="users per worker")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake model latency in seconds")
+    parser.add_argument("--backend", default="sqlite", choices=["sqlite", "memory"])
+    args = parser.parse_args()
+
+    print(f"backend={args.backend} latency={args.latency * 1000:.0f}ms cpus={os.cpu_count()}")
+    print(f"{'workers':>8} {'turns/s':>9} {'speedup':>8} {'checkpoints':>12} {'db KiB':>8}")
+    base = None
+    for workers in args.workers:
+        throughput, rows, db_size = run(workers, args)
+        base = base or throughput
+        print(f"{workers:>8} {throughput:>9.1f} {throughput / base:>7.2f}x {rows:>12} {db_size / 1024:>8.0f}")
@@ -0,0 +1,95 @@
+# Behavioural check of checkpoint.SQLiteCheckpointSaver against the LangGraph saver interface:
+# put/get_tuple/list, put_writes, resuming from a fresh instance and compaction to keep_checkpoints.
+# Exits non-zero on the first mismatch.
+# usage: python benchmarks/checkpoint_check.py
+import asyncio
+import itertools
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+from langgraph.graph import START, MessagesState, StateGraph
+
+from checkpoint import SQLiteCheckpointSaver
+
+path = os.path.join(tempfile.mkdtemp(), "checkpoints.db")
+
+
+def rows(table: str, thread_id: str) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE thread_id = ?", (thread_id,)).fetchone()[0]
+
+
+def put_chain(saver, thread_id: str, count: int, parent: dict = None) -> list:
+    # `count` checkpoints, each the child of the previous one (or of `parent`), returns their configs
+    config = parent or {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    checkpoint = saver.get_tuple(parent).checkpoint if parent else empty_checkpoint()
+    configs = []
+    for step in range(count):
+        checkpoint = create_checkpoint(checkpoint, None, step)
+        checkpoint["channel_values"] = {"step": step}
+        config = saver.put(config, checkpoint, {"source": "loop", "step": step}, {})
+        configs.append(config)
+    return configs
+
+
+# put / get_tuple / put_writes
+saver = SQLiteCheckpointSaver(path, keep_checkpoints=2)
+configs = put_chain(saver, "a", 2)
+latest = saver.get_tuple({"configurable": {"thread_id": "a"}})
+assert latest.config == configs[-1], latest.config
+assert latest.checkpoint["channel_values"] == {"step": 1}
+assert latest.metadata["step"] == 1
+assert latest.parent_config == configs[0], latest.parent_config
+assert saver.get_tuple(configs[0]).checkpoint["channel_values"] == {"step": 0}
+assert saver.get_tuple({"configurable": {"thread_id": "missing"}}) is None
+
+saver.put_writes(configs[-1], [("messages", "hello"), ("step", 2)], task_id="task-1")
+saver.put_writes(configs[-1], [("messages", "hello again")], task_id="task-1") # same task and idx, kept once
+pending = saver.get_tuple(configs[-1]).pending_writes
+assert pending == [("task-1", "messages", "hello"), ("task-1", "step", 2)], pending
+
+# a fresh instance (another worker, or after a restart) sees the same thread
+resumed = SQLiteCheckpointSaver(path, keep_checkpoints=2)
+again = resumed.get_tuple({"configurable": {"thread_id": "a"}})
+assert again.config == latest.config and again.checkpoint["id"] == latest.checkpoint["id"]
+assert again.pending_writes == pending
+assert [t.config for t in resumed.list({"configurable": {"thread_id": "a"}})] == configs[::-1]
+assert asyncio.run(resumed.aget_tuple({"configurable": {"thread_id": "a"}})).config == latest.config
+
+# compaction: only the newest keep_checkpoints checkpoints, and their writes, survive a put
+configs = put_chain(saver, "b", 2)
+saver.put_writes(configs[0], [("messages", "old")], task_id="task-old")
+configs += put_chain(saver, "b", 3, parent=configs[-1])
+put_chain(saver, "c", 1) # other threads are left alone
+assert rows("checkpoints", "b") == 2, rows("checkpoints", "b")
+assert [t.config for t in saver.list({"configurable": {"thread_id": "b"}})] == configs[:-3:-1]
+assert rows("writes", "b") == 0 # writes of compacted checkpoints go with them
+smaller = SQLiteCheckpointSaver(path, keep_checkpoints=1)
+assert smaller.compact(vacuum=True) == 3
+assert rows("checkpoints", "a") == 1 and rows("checkpoints", "b") == 1 and rows("checkpoints", "c") == 1
+assert smaller.get_tuple({"configurable": {"thread_id": "b"}}).config == configs[-1]
+
+# end to end: a conversation continues from a fresh saver and graph
+def chat_app(saver):
+    model = GenericFakeChatModel(messages=(f"reply {i}" for i in itertools.count()))
+    workflow = StateGraph(state_schema=MessagesState)
+    workflow.add_node("model", lambda state: {"messages": model.invoke(state["messages"])})
+    workflow.add_edge(START, "model")
+    return workflow.compile(checkpointer=saver)
+
+thread = {"configurable": {"thread_id": "user:check"}}
+chat_app(SQLiteCheckpointSaver(path)).invoke({"messages": [HumanMessage("hi")]}, thread)
+app = chat_app(SQLiteCheckpointSaver(path))
+app.invoke({"messages": [HumanMessage("still there?")]}, thread)
+messages = app.get_state(thread).values["messages"]
+assert [m.content for m in messages] == ["hi", "reply 0", "still there?", "reply 0"], messages
+assert rows("checkpoints", "user:check") == 2
+
+print("SQLiteCheckpointSaver: put/get_tuple/list, put_writes, resume and compaction ok")
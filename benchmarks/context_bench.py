@@ -0,0 +1,50 @@
+# Prompt size per turn over a long conversation, with an offline fake model.
+# usage: python benchmarks/context_bench.py [--turns 300]
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.chdir(tempfile.mkdtemp())
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import SystemMessage
+
+import chatbot
+from background import get_queue
+from context import build_prompt, message_tokens
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--turns", type=int, default=300)
+args = parser.parse_args()
+
+reply = "Here is a fairly detailed answer that goes on for a while, " * 8
+chatbot.set_llm("core_llm", GenericFakeChatModel(messages=(f"{reply} ({i})" for i in itertools.count())))
+chatbot.set_llm("personal_info", GenericFakeChatModel(messages=itertools.cycle(["NO PERSONAL INFORMATION"])))
+# every turn on the fake core_llm, short ones would otherwise go to a real small_llm
+chatbot.bot_config["model_routing"]["enabled"] = False
+
+# keep the chatbot's own prints out of the table
+out = sys.stdout
+sys.stdout = open(os.devnull, "w")
+
+bot = chatbot.ChatBotLangchain("bench_user")
+print(f"{'turn':>6} {'prompt tokens':>14} {'history msgs':>13} {'hidden msgs':>12} {'turn ms':>8}", file=out)
+max_hidden = 0
+for turn in range(1, args.turns + 1):
+    start = time.perf_counter()
+    bot.get_response(f"Question {turn}: tell me more about topic number {turn} please", "bench_user")
+    elapsed = (time.perf_counter() - start) * 1000
+    get_queue("summary").join()
+    # messages in neither the next prompt nor the summary
+    state = bot.app.get_state(bot._thread_config()).values
+    prompt = build_prompt(state, bot.system_prompt)
+    hidden = len(state["messages"]) - sum(not isinstance(m, SystemMessage) for m in prompt)
+    max_hidden = max(max_hidden, hidden)
+    if turn in (1, 10, 50, 100, 200, 300, 500, 1000) or turn == args.turns:
+        print(f"{turn:>6} {sum(message_tokens(m) for m in prompt):>14} {len(state['messages']):>13} {hidden:>12} {elapsed:>8.2f}", file=out)
+print(f"most messages in neither the prompt nor the summary after a turn: {max_hidden}", file=out)
@@ -0,0 +1,81 @@
+# LLM calls and prompt tokens spent on personal info extraction for a recorded conversation corpus:
+# one call per turn (the old _check_and_add_personal_info path) vs the batching ExtractionScheduler.
+# Turns are labelled with the facts they carry, the fake LLM finds exactly those in the turns it is
+# sent, so fact recall measures what the local pre-filter loses.
+# usage: python benchmarks/extraction_bench.py [--batch-size 8]
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.chdir(tempfile.mkdtemp())
+
+from langchain_core.messages import AIMessage
+
+from context import count_tokens
+from chatbot import personal_info_list
+from extraction import ExtractionScheduler
+from storage import SQLiteStorage
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--corpus", default=os.path.join(ROOT, "benchmarks", "conversation_corpus.jsonl"))
+parser.add_argument("--batch-size", type=int, default=8)
+args = parser.parse_args()
+
+
+class RecordingLLM:
+    # counts calls and prompt tokens, answers with the labelled facts of the turns it is sent
+    def __init__(self, labels: dict):
+        self.labels = labels
+        self.calls = 0
+        self.tokens = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        self.tokens += sum(count_tokens(str(m.content)) for m in messages)
+        turns = re.findall(r"\[turn (\d+)\]\n(?:AI: .*\n)?Human: (.*)\n", messages[-1].content)
+        facts = [{"turn": int(turn), "category": category, "detail": detail}
+                 for turn, human in turns for category, detail in self.labels.get(human, [])]
+        return AIMessage(content=json.dumps({"facts": facts}))
+
+
+with open(args.corpus) as file:
+    corpus = [json.loads(line) for line in file if line.strip()]
+labels = {turn["human"]: turn["facts"] for turn in corpus if turn.get("facts")}
+expected = {(turn["user_id"], category, detail) for turn in corpus for category, detail in turn.get("facts", [])}
+
+# old path: the long per-turn prompt for every single turn
+old_prompt_tokens = count_tokens("\n".join(personal_info_list)) + 110 # + ~85 words of fixed instructions
+old_calls = len(corpus)
+old_tokens = sum(old_prompt_tokens + count_tokens(f"Human: {t['human']}\nAI: {t['ai']}") for t in corpus)
+
+out = sys.stdout
+sys.stdout = open(os.devnull, "w")
+
+llm = RecordingLLM(labels)
+storage = SQLiteStorage("bench.db", flush_interval=0)
+# batches are flushed inline here instead of on the background queue, so the count is deterministic
+scheduler = ExtractionScheduler(lambda: llm, lambda: storage, personal_info_list, batch_size=len(corpus) + 1, max_wait=0)
+for turn in corpus:
+    scheduler.add(turn["user_id"], turn["human"], turn["ai"])
+    if scheduler.stats()["pending"] >= args.batch_size:
+        scheduler.flush()
+scheduler.flush()
+sys.stdout = out
+
+stats = scheduler.stats()
+found = {(user_id, category, detail) for user_id in {turn["user_id"] for turn in corpus}
+         for category, details in (storage.load_personal_info(user_id, "all") or {}).items() for detail in details}
+missed = sorted(expected - found)
+print(f"turns:                  {len(corpus)} ({stats['skipped']} skipped by the pre-filter)")
+print(f"fact recall per-turn:   {len(expected)}/{len(expected)}")
+print(f"fact recall batched:    {len(expected & found)}/{len(expected)}" + (f"  missed {missed}" if missed else ""))
+print(f"LLM calls  per-turn:    {old_calls}")
+print(f"LLM calls  batched:     {llm.calls}  ({old_calls / max(llm.calls, 1):.1f}x fewer)")
+print(f"tokens/turn per-turn:   {old_tokens / len(corpus):.0f}")
+print(f"tokens/turn batched:    {llm.tokens / len(corpus):.0f}  ({old_tokens / max(llm.tokens, 1):.1f}x fewer)")
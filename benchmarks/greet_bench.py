@@ -0,0 +1,89 @@
+# /greet with --users stored users (default 1M): the old path (all user ids read from storage, then a
+# load_personal_info) against the in-memory user index, plus index load time and memory.
+# usage: python benchmarks/greet_bench.py [--users 1000000] [--greets 20000] [--old-greets 5]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "bench")
+
+from storage import SQLiteStorage
+from user_index import UserIndex
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--users", type=int, default=1_000_000)
+parser.add_argument("--greets", type=int, default=20000)
+parser.add_argument("--old-greets", type=int, default=5, help="the old path reads every user id, keep it small")
+args = parser.parse_args()
+
+NAMES = ["Alex", "Sam", "Priya", "Chen", "Maria", "Omar", "Lena", "Kofi", "Ana", "Yuki"]
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/status") as file:
+        for line in file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * (len(ordered) - 1)))]
+
+
+def old_greet(storage, user_id: str) -> str:
+    # what greet() did before the index (minus the second get_all_users it printed)
+    if user_id not in storage.get_all_users():
+        return "Hello! How can I help you today?"
+    name = storage.load_personal_info(user_id, "name")
+    return f"Hello {name[0]}! How can I help you today?" if name else "Hello! How can I help you today?"
+
+
+os.chdir(tempfile.mkdtemp())
+storage = SQLiteStorage("personal_info.db", flush_interval=0)
+start = time.perf_counter()
+conn = storage._conn()
+with conn:
+    # 70% of users have told us their name, everyone has a location
+    conn.executemany(
+        "INSERT INTO personal_info (user_id, info_type, info, created_at) VALUES (?, ?, ?, ?)",
+        ((f"user-{i}", kind, value, time.time())
+         for i in range(args.users)
+         for kind, value in ((("name", NAMES[i % len(NAMES)]),) if i % 10 < 7 else ()) + (("location", "Pune"),)),
+    )
+print(f"seeded {args.users} users in {time.perf_counter() - start:.1f} s")
+
+rng = random.Random(0)
+ids = [f"user-{rng.randrange(args.users * 11 // 10)}" for _ in range(args.greets)] # ~10% unknown users
+
+old = []
+for user_id in ids[:args.old_greets]:
+    start = time.perf_counter()
+    old_greet(storage, user_id)
+    old.append(time.perf_counter() - start)
+
+rss_before = rss_bytes()
+index = UserIndex(storage, refresh_interval=5)
+rss_after = rss_bytes()
+loaded = index.stats()
+
+new = []
+for user_id in ids:
+    start = time.perf_counter()
+    index.greeting(user_id)
+    new.append(time.perf_counter() - start)
+
+storage.save_personal_info("new-user", "name", "Zoe")
+assert index.greeting("new-user") == "Hello Zoe! How can I help you today?"
+
+print(f"index: {loaded['users']} users ({loaded['named']} named) loaded in {index.load_seconds:.2f} s, "
+      f"{(rss_after - rss_before) / 2**20:.0f} MiB ({(rss_after - rss_before) / loaded['users']:.0f} B per user)")
+print(f"{'':>22} {'p50':>10} {'p99':>10}")
+print(f"{'old greet (storage)':>22} {percentile(old, 50) * 1000:>8.1f}ms {percentile(old, 99) * 1000:>8.1f}ms   ({len(old)} greets)")
+print(f"{'index greet':>22} {percentile(new, 50) * 1e6:>8.1f}us {percentile(new, 99) * 1e6:>8.1f}us   ({len(new)} greets)")
+print("a write through storage is visible to the next greeting: ok")
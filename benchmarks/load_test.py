@@ -0,0 +1,224 @@
+# Reference load test: starts the stub LLM/weather server and the app, drives /greet and /chat with
+# many concurrent synthetic users, reports latency percentiles, throughput, memory per session and
+# storage write amplification. Nothing leaves the machine.
+# usage: python benchmarks/load_test.py [--users 50] [--turns 10] [--server uvicorn|flask] [--latency 0.2]
+#        python benchmarks/load_test.py --url http://127.0.0.1:5000   (an already running app, no memory/io numbers)
+import argparse
+import glob
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+NAMES = ["Alex", "Sam", "Priya", "Chen", "Maria", "Omar", "Lena", "Kofi"]
+CITIES = ["London", "Pune", "Tokyo", "Berlin", "Lagos", "Lima", "Austin", "Oslo"]
+HOBBIES = ["hiking", "chess", "painting", "cycling", "jazz piano", "baking"]
+MESSAGES = [
+    "My name is {name}",
+    "I live in {city}",
+    "I really enjoy {hobby} on weekends",
+    "What's the weather in {city}?",
+    "weather please",
+    "what time is it",
+    "Why is the sky blue?",
+    "Can you suggest a weekend plan for me?",
+    "Tell me more about that",
+    "What is the capital of France?",
+    "Explain recursion in simple words",
+    "ok thanks",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as file:
+        for line in file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def disk_writes(pid: int) -> int:
+    # bytes the process caused to be written to storage (0 on filesystems that don't account it)
+    try:
+        with open(f"/proc/{pid}/io") as file:
+            for line in file:
+                if line.startswith("write_bytes:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def db_bytes(workdir: str) -> int:
+    return sum(os.path.getsize(path) for path in glob.glob(os.path.join(workdir, "*.db*")))
+
+
+def start_servers(args, workdir: str):
+    stub_port, app_port = free_port(), free_port()
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "stub_server.py"), "--port", str(stub_port), "--latency", str(args.latency),
+         "--tokens-per-second", str(args.tokens_per_second), "--tokens", str(args.tokens)],
+        stdout=subprocess.DEVNULL,
+    )
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT,
+        "GROQ_API_KEY": "stub",
+        "GROQ_API_BASE": f"http://127.0.0.1:{stub_port}",
+        "WEATHER_API_KEY": "stub",
+        "WEATHER_API_URL": f"http://127.0.0.1:{stub_port}/v1",
+    }
+    if args.server == "uvicorn":
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(app_port), "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "-c", f"from web import app; app.run(port={app_port}, threaded=True)"]
+    app = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for(f"http://127.0.0.1:{stub_port}/stats")
+    wait_for(f"http://127.0.0.1:{app_port}/sessions/stats")
+    return stub, app, f"http://127.0.0.1:{stub_port}", f"http://127.0.0.1:{app_port}"
+
+
+def run_user(url: str, user: int, args, results: list, lock: threading.Lock):
+    rng = random.Random(user)
+    user_id = f"load-{user}"
+    values = {"name": rng.choice(NAMES), "city": rng.choice(CITIES), "hobby": rng.choice(HOBBIES)}
+    session = requests.Session()
+    calls = [("/greet", {"user_id": user_id})]
+    calls += [("/chat", {"user_id": user_id, "message": rng.choice(MESSAGES).format(**values)}) for _ in range(args.turns)]
+
+    for path, payload in calls:
+        start = time.perf_counter()
+        try:
+            response = session.post(url + path, json=payload, timeout=120)
+            ok = response.status_code == 200 and "encountered an error" not in response.text
+            text = response.json().get("response") or ""
+        except (requests.RequestException, ValueError):
+            ok, text = False, ""
+        elapsed = time.perf_counter() - start
+        logical = len(payload.get("message", "").encode()) + len(str(text).encode()) if path == "/chat" else 0
+        with lock:
+            results.append({"path": path, "seconds": elapsed, "ok": ok, "bytes": logical})
+        if args.think:
+            time.sleep(rng.uniform(0, args.think))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50, help="concurrent synthetic users")
+    parser.add_argument("--turns", type=int, default=10, help="chat messages per user, after one /greet")
+    parser.add_argument("--think", type=float, default=0.0, help="max seconds a user waits between requests")
+    parser.add_argument("--server", default="uvicorn", choices=["uvicorn", "flask"])
+    parser.add_argument("--url", help="test an already running app instead of starting one")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub LLM time to first token, seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=250)
+    parser.add_argument("--tokens", type=int, default=60, help="words per stub reply")
+    parser.add_argument("--output", help="write the results as json, to compare runs")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    stub = app = None
+    if args.url:
+        url, stub_url = args.url.rstrip("/"), None
+    else:
+        stub, app, stub_url, url = start_servers(args, workdir)
+
+    try:
+        # one warm-up request so imports and client setup are not counted
+        requests.post(url + "/chat", json={"user_id": "warmup", "message": "hello"}, timeout=60)
+        rss_before = rss_bytes(app.pid) if app else 0
+        writes_before = disk_writes(app.pid) if app else 0
+        db_before = db_bytes(workdir)
+
+        results, lock = [], threading.Lock()
+        threads = [threading.Thread(target=run_user, args=(url, user, args, results, lock)) for user in range(args.users)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        time.sleep(1) # let buffered storage writes land
+        sessions = requests.get(url + "/sessions/stats", timeout=10).json()
+        stub_stats = requests.get(stub_url + "/stats", timeout=10).json() if stub_url else {}
+        rss_after = rss_bytes(app.pid) if app else 0
+        written = (disk_writes(app.pid) - writes_before) if app else 0
+        db_growth = db_bytes(workdir) - db_before
+    finally:
+        for proc in (app, stub):
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+
+    report = {"users": args.users, "turns": args.turns, "server": args.server if not args.url else args.url,
+              "wall_seconds": round(wall, 2), "requests": len(results),
+              "throughput_rps": round(len(results) / wall, 1), "errors": sum(not r["ok"] for r in results)}
+    print(f"{args.users} users x (1 greet + {args.turns} chat), stub latency {args.latency * 1000:.0f} ms, "
+          f"{args.tokens_per_second:.0f} tok/s, server {report['server']}")
+    print(f"{'endpoint':>8} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for path in ("/greet", "/chat"):
+        times = [r["seconds"] * 1000 for r in results if r["path"] == path]
+        report[path] = {p: round(percentile(times, q), 1) for p, q in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))}
+        print(f"{path:>8} {len(times):>6} {report[path]['p50']:>8.1f} {report[path]['p95']:>8.1f} "
+              f"{report[path]['p99']:>8.1f} {report[path]['max']:>8.1f}")
+    print(f"throughput {report['throughput_rps']} req/s over {wall:.1f} s, errors {report['errors']}")
+
+    if app:
+        live = sessions.get("sessions") or 1
+        report["memory_per_session_kib"] = round((rss_after - rss_before) / live / 1024, 1)
+        print(f"server RSS {rss_before / 2**20:.1f} -> {rss_after / 2**20:.1f} MiB, {live} live sessions, "
+              f"{report['memory_per_session_kib']} KiB per session")
+        logical = sum(r["bytes"] for r in results)
+        report["logical_bytes"] = logical
+        report["disk_write_bytes"] = written
+        report["db_growth_bytes"] = db_growth
+        amplification = f"{written / logical:.1f}x" if written else "n/a (write_bytes not accounted here)"
+        print(f"storage: {logical / 1024:.0f} KiB of chat text, {written / 1024:.0f} KiB written to disk ({amplification}), "
+              f"db files grew {db_growth / 1024:.0f} KiB ({db_growth / logical if logical else 0:.1f}x)")
+    if stub_stats:
+        chats = sum(1 for r in results if r["path"] == "/chat")
+        calls = stub_stats["chat"] + stub_stats["chat_stream"]
+        report["llm_calls_per_chat"] = round(calls / chats, 2) if chats else 0
+        print(f"LLM calls {calls} ({report['llm_calls_per_chat']} per chat turn), weather calls {stub_stats['weather']}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# System prompt size and context build time against the number of stored facts per user,
+# all facts in the prompt (before) vs the top-k retrieved for the message (memory.py).
+# usage: python benchmarks/memory_bench.py [--sizes 10 50 200 1000 5000]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.chdir(tempfile.mkdtemp())
+
+import chatbot
+from context import count_tokens
+from memory import UserMemory
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200, 1000, 5000])
+parser.add_argument("--turns", type=int, default=200)
+args = parser.parse_args()
+
+WORDS = (
+    "river mountain jazz sushi chess marathon python guitar garden coffee novel painting cycling "
+    "kyoto lisbon nurse hospital startup yoga tennis ramen cats violin photography sailing"
+).split()
+MESSAGES = [
+    "Can you recommend a book for the weekend?",
+    "What should I cook tonight?",
+    "Any tips for my marathon training?",
+    "Plan a short trip for me",
+    "What music would I like?",
+]
+
+random.seed(1)
+out = sys.stdout
+sys.stdout = open(os.devnull, "w")
+base_tokens = count_tokens(chatbot.bot_config["bot"]["prompt"]["system"])
+
+print(f"{'facts':>6} {'kept':>6} {'all-facts tok':>14} {'top-k tok':>10} {'build ms':>9} {'rebuild ms':>11} {'all-facts ms':>13} {'turn ms':>8}", file=out)
+for size in args.sizes:
+    user_id = f"user_{size}"
+    bot = chatbot.ChatBotLangchain(user_id)
+    facts = [
+        (random.choice(chatbot.personal_info_list), f"{random.choice(WORDS)} {random.choice(WORDS)} {i}")
+        for i in range(size)
+    ]
+    bot.storage.save_many([(user_id, info_type, info) for info_type, info in facts])
+    user_data = bot.storage.load_personal_info(user_id, "all")
+
+    start = time.perf_counter()
+    everything = bot.parse_user_personal_info(user_id, user_data)
+    full_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    memory = UserMemory(user_data)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    # one more fact saved, the memory is rebuilt reusing the previous embeddings
+    user_data.setdefault("hobbies", []).append("sailing on weekends")
+    start = time.perf_counter()
+    UserMemory(user_data, previous=memory)
+    rebuild_ms = (time.perf_counter() - start) * 1000
+
+    bot._rendered_context() # warm the per-user cache, as on a normal turn
+    start = time.perf_counter()
+    tokens = 0
+    for turn in range(args.turns):
+        tokens += count_tokens(bot._context_for(MESSAGES[turn % len(MESSAGES)])["system_prompt"])
+    turn_ms = (time.perf_counter() - start) * 1000 / args.turns
+
+    print(
+        f"{size:>6} {len(memory):>6} {base_tokens + count_tokens(everything):>14} {tokens // args.turns:>10} "
+        f"{build_ms:>9.1f} {rebuild_ms:>11.1f} {full_ms:>13.1f} {turn_ms:>8.2f}",
+        file=out,
+    )
@@ -0,0 +1,109 @@
+# Model tier report and quality regression check over a fixed prompt set (benchmarks/tier_prompts.jsonl).
+# Every prompt is answered with model routing off (everything on core_llm) and on, then calls, latency,
+# tokens and cost are reported per tier. The check fails (exit 1) when a prompt is routed to the wrong
+# tier or tool, or, with --live, when routed answers pass the keyword checks less often than core_llm's.
+# Offline (default) the Groq API is the stub server, with a faster small model.
+# usage: python benchmarks/model_tier_bench.py [--latency 0.3] [--small-latency 0.08] [--live] [--tolerance 0.05]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from load_test import free_port, percentile, wait_for
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--prompts", default=os.path.join(HERE, "tier_prompts.jsonl"))
+parser.add_argument("--live", action="store_true", help="call the real Groq API (GROQ_API_KEY) and check answer keywords")
+parser.add_argument("--latency", type=float, default=0.3, help="stub time to first token for core_llm")
+parser.add_argument("--small-latency", type=float, default=0.08, help="stub time to first token for the small models")
+parser.add_argument("--tolerance", type=float, default=0.05, help="allowed drop in keyword pass rate with routing on")
+args = parser.parse_args()
+
+with open(args.prompts) as file:
+    prompts = [json.loads(line) for line in file]
+
+stub = None
+if not args.live:
+    from config import bot_config as defaults
+    small_models = {defaults["model"][name]["name"] for name in ("small_llm", "personal_info")}
+    port = free_port()
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "stub_server.py"), "--port", str(port), "--latency", str(args.latency),
+         "--tokens", "40"] + [f"--model-latency={model}={args.small_latency}" for model in small_models],
+        stdout=subprocess.DEVNULL,
+    )
+    wait_for(f"http://127.0.0.1:{port}/stats")
+    os.environ["GROQ_API_KEY"] = "stub"
+    os.environ["GROQ_API_BASE"] = f"http://127.0.0.1:{port}"
+os.chdir(tempfile.mkdtemp())
+
+import chatbot
+import model_router
+from config import bot_config
+from weather import StubWeatherProvider, set_weather_provider
+
+set_weather_provider(StubWeatherProvider())
+bot_config["extraction"]["max_wait"] = 0
+out = sys.stdout
+sys.stdout = open(os.devnull, "w")
+
+
+def passes(prompt: dict, answer: str) -> bool:
+    return not prompt["expect"] or any(word in answer.lower() for word in prompt["expect"])
+
+
+def run(routing: bool) -> dict:
+    bot_config["model_routing"]["enabled"] = routing
+    mismatches = []
+    for i, prompt in enumerate(prompts):
+        bot = chatbot.ChatBotLangchain(f"route-{routing}-{i}")
+        tier = model_router.choose_tier(prompt["message"])
+        tool = bot._check_tool_query(prompt["message"])["tool"]
+        if (routing and tier != prompt["tier"]) or tool != prompt["tool"]:
+            mismatches.append(f"{prompt['message']!r}: tier {tier} (want {prompt['tier']}), tool {tool} (want {prompt['tool']})")
+
+    model_router.usage = model_router.TierUsage()
+    latencies, passed = [], 0
+    for i, prompt in enumerate(prompts):
+        bot = chatbot.ChatBotLangchain(f"answer-{routing}-{i}")
+        start = time.perf_counter()
+        answer = bot.get_response(prompt["message"], bot.user_id)
+        latencies.append(time.perf_counter() - start)
+        passed += passes(prompt, answer)
+    return {"usage": model_router.usage.stats(), "latencies": latencies, "pass_rate": passed / len(prompts), "mismatches": mismatches}
+
+
+try:
+    runs = {"routing off": run(False), "routing on": run(True)}
+finally:
+    if stub is not None:
+        stub.terminate()
+        stub.wait()
+
+print(f"{len(prompts)} prompts, {'live Groq API' if args.live else f'stub API, core {args.latency * 1000:.0f} ms / small {args.small_latency * 1000:.0f} ms'}", file=out)
+print(f"{'':>12} {'tier':>14} {'model':>24} {'calls':>6} {'escal':>6} {'avg ms':>8} {'prompt tok':>11} {'compl tok':>10} {'cost $':>10}", file=out)
+for name, result in runs.items():
+    for tier, entry in sorted(result["usage"].items()):
+        print(f"{name:>12} {tier:>14} {entry['model']:>24} {entry['calls']:>6} {entry['escalations']:>6} {entry['avg_ms']:>8.1f} "
+              f"{entry['prompt_tokens']:>11} {entry['completion_tokens']:>10} {entry['cost_usd']:>10.6f}", file=out)
+for name, result in runs.items():
+    cost = sum(entry["cost_usd"] for entry in result["usage"].values())
+    times = [seconds * 1000 for seconds in result["latencies"]]
+    print(f"{name:>12}: turn p50 {percentile(times, 50):.0f} ms, p95 {percentile(times, 95):.0f} ms, cost ${cost:.6f}, "
+          f"keyword pass rate {result['pass_rate']:.0%}", file=out)
+
+failures = runs["routing off"]["mismatches"] + runs["routing on"]["mismatches"]
+if args.live and runs["routing on"]["pass_rate"] < runs["routing off"]["pass_rate"] - args.tolerance:
+    failures.append(f"routed pass rate {runs['routing on']['pass_rate']:.0%} vs {runs['routing off']['pass_rate']:.0%} on core_llm only")
+for failure in failures:
+    print(f"FAIL {failure}", file=out)
+if not args.live:
+    print("answer quality is only checked with --live, the stub replies are filler text", file=out)
+sys.exit(1 if failures else 0)
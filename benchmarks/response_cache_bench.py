@@ -0,0 +1,120 @@
+# Replays a traffic log with the semantic response cache off and on, with an offline model
+# that takes --latency seconds per call and answers "Answer to: <question>".
+# Then checks question pairs that must never share an answer (reversed conversions and comparisons,
+# date and news questions), exits non-zero if one is served from the cache.
+# usage: python benchmarks/response_cache_bench.py [--log benchmarks/traffic_log.jsonl] [--latency 0.3]
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "bench")
+LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traffic_log.jsonl")
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--log", default=LOG_PATH)
+parser.add_argument("--latency", type=float, default=0.3)
+parser.add_argument("--threshold", type=float, default=None)
+args = parser.parse_args()
+os.chdir(tempfile.mkdtemp())
+
+import chatbot
+import response_cache
+from config import bot_config
+from weather import StubWeatherProvider, set_weather_provider
+
+
+class EchoModel(BaseChatModel):
+    latency: float = 0.0
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"Answer to: {messages[-1].content}"))])
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo"
+
+
+# (stored question, later question): the later one must not get the stored answer
+NEGATIVE_PAIRS = [
+    ("Convert 100 fahrenheit to celsius", "Convert 100 celsius to fahrenheit"),
+    ("Convert 100 fahrenheit to celsius", "Convert 200 fahrenheit to celsius"),
+    ("Is a whale bigger than an elephant?", "Is an elephant bigger than a whale?"),
+    ("Is gold heavier than silver?", "Is silver heavier than gold?"),
+    ("What is today's date?", "What is today's date?"),
+    ("What's the latest news today?", "What's the latest news today?"),
+    ("Who is the current president of France?", "Who is the current president of France?"),
+]
+
+with open(args.log) as file:
+    log = [json.loads(line) for line in file]
+topic_of = {entry["message"]: entry["topic"] for entry in log}
+
+chatbot.set_llm("core_llm", EchoModel(latency=args.latency))
+chatbot.set_llm("personal_info", EchoModel())
+# every turn on the echo core_llm, short ones would otherwise go to a real small_llm
+bot_config["model_routing"]["enabled"] = False
+set_weather_provider(StubWeatherProvider())
+bot_config["extraction"]["max_wait"] = 0
+
+out = sys.stdout
+sys.stdout = open(os.devnull, "w")
+
+
+def replay(enabled: bool) -> dict:
+    bot_config["response_cache"]["enabled"] = enabled
+    if args.threshold is not None:
+        bot_config["response_cache"]["threshold"] = args.threshold
+    response_cache._cache = None
+    bots = {}
+    latencies = []
+    wrong = 0
+    for i, entry in enumerate(log):
+        user = f"{entry['user']}-{'on' if enabled else 'off'}"
+        bot = bots.setdefault(user, chatbot.ChatBotLangchain(user))
+        start = time.perf_counter()
+        answer = bot.get_response(entry["message"], user)
+        latencies.append(time.perf_counter() - start)
+        # a cached answer to a question about another topic is a wrong hit
+        if answer.startswith("Answer to: ") and entry["topic"] is not None:
+            if topic_of.get(answer[len("Answer to: "):], entry["topic"]) != entry["topic"]:
+                wrong += 1
+    cache = response_cache.get_response_cache()
+    return {"latencies": latencies, "wrong": wrong, "stats": cache.stats() if cache else {}}
+
+
+off = replay(False)
+on = replay(True)
+stats = on["stats"]
+cacheable = sum(entry["topic"] is not None for entry in log)
+
+print(f"{len(log)} turns, {cacheable} context-free, model latency {args.latency * 1000:.0f} ms", file=out)
+print(f"{'':>10} {'total s':>8} {'mean ms':>8}", file=out)
+for name, run in (("cache off", off), ("cache on", on)):
+    print(f"{name:>10} {sum(run['latencies']):>8.2f} {sum(run['latencies']) / len(log) * 1000:>8.1f}", file=out)
+print(
+    f"hits {stats['hits']} ({stats['exact_hits']} exact), misses {stats['misses']}, bypassed {stats['bypassed']}, "
+    f"hit rate {stats['hit_rate']:.1%} of lookups / {stats['hits'] / len(log):.1%} of all turns",
+    file=out,
+)
+print(f"latency saved {stats['saved_seconds']:.2f} s, wrong hits {on['wrong']}", file=out)
+
+cfg = bot_config["response_cache"]
+served = []
+for stored, asked in NEGATIVE_PAIRS:
+    cache = response_cache.SemanticResponseCache(cfg["threshold"], cfg["max_entries"], cfg["ttl"])
+    cache.store(stored, f"Answer to: {stored}")
+    if cache.lookup(asked) is not None:
+        served.append((stored, asked))
+print(f"negative pairs served from the cache: {len(served)}/{len(NEGATIVE_PAIRS)}", file=out)
+for stored, asked in served:
+    print(f"  {asked!r} got the answer to {stored!r}", file=out)
+sys.exit(1 if served else 0)
@@ -0,0 +1,58 @@
+# Accuracy, coverage and latency of the local intent router on a labelled query set.
+# usage: python benchmarks/router_bench.py [--threshold 0.8] [-v]
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GROQ_API_KEY", "bench")
+
+from config import bot_config
+from chatbot import tools_registry
+from router import IntentRouter
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--queries", default=os.path.join(ROOT, "benchmarks", "router_queries.jsonl"))
+parser.add_argument("--threshold", type=float, default=bot_config["router"]["local_confidence"])
+parser.add_argument("-v", "--verbose", action="store_true")
+args = parser.parse_args()
+
+with open(args.queries) as file:
+    queries = [json.loads(line) for line in file if line.strip()]
+
+router = IntentRouter(tools_registry)
+local = correct = city_correct = city_total = 0
+latencies = []
+for row in queries:
+    start = time.perf_counter()
+    result = router.classify_many(row["query"], args.threshold) # what the chatbot routes with
+    latencies.append((time.perf_counter() - start) * 1e6)
+
+    if result["confidence"] < args.threshold:
+        if args.verbose:
+            print(f"LLM    {row['query']!r} -> {result['tool']} ({result['confidence']})")
+        continue
+    local += 1
+    # a local answer is only right with the right city too, or none when the query names none
+    city = result["params"].get("city", "")
+    city_ok = city.lower() == row.get("city", "").lower()
+    ok = result["tool"] == row["tool"] and (row["tool"] != "weather" or city_ok)
+    # turns asking for several things must keep every call
+    ok = ok and [call["tool"] for call in result["calls"]] == row.get("tools", [row["tool"]] if row["tool"] != "none" else [])
+    correct += ok
+    if row.get("city"):
+        city_total += 1
+        city_correct += city_ok
+    if args.verbose and not ok:
+        print(f"WRONG  {row['query']!r} -> {result['tool']} {result['params']} (expected {row['tool']} {row.get('city', '')})")
+
+latencies.sort()
+print(f"queries:              {len(queries)}")
+print(f"routed locally:       {local} ({local / len(queries):.0%}), rest go to the LLM router")
+print(f"local accuracy:       {correct / max(local, 1):.1%}")
+print(f"city extraction:      {city_correct}/{city_total}")
+print(f"latency p50 / p99:    {statistics.median(latencies):.1f} / {latencies[int(len(latencies) * 0.99) - 1]:.1f} us")
@@ -0,0 +1,44 @@
+# Cold /greet latency (session creation + greet) and memory per live session.
+# usage: python benchmarks/session_bench.py [--sessions 200] [--repo <checkout to measure>]
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--sessions", type=int, default=200)
+parser.add_argument("--repo", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+args = parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(args.repo))
+os.environ.setdefault("GROQ_API_KEY", "bench") # clients are built but never called
+os.chdir(tempfile.mkdtemp()) # keep the storage files out of the repo
+
+from chatbot import ChatBotLangchain
+
+# first session pays for imports and shared setup, report it on its own
+start = time.perf_counter()
+ChatBotLangchain("warmup").greet("warmup")
+first_ms = (time.perf_counter() - start) * 1000
+
+sessions = []
+latencies = []
+tracemalloc.start()
+before = tracemalloc.get_traced_memory()[0]
+for i in range(args.sessions):
+    start = time.perf_counter()
+    bot = ChatBotLangchain(f"user_{i}")
+    bot.greet(f"user_{i}")
+    latencies.append((time.perf_counter() - start) * 1000)
+    sessions.append(bot)
+after = tracemalloc.get_traced_memory()[0]
+tracemalloc.stop()
+
+latencies.sort()
+print(f"first session:        {first_ms:.2f} ms")
+print(f"cold greet p50:       {statistics.median(latencies):.3f} ms")
+print(f"cold greet p95:       {latencies[int(len(latencies) * 0.95) - 1]:.3f} ms")
+print(f"memory per session:   {(after - before) / args.sessions / 1024:.1f} KiB")
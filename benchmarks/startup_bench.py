@@ -0,0 +1,142 @@
+# Startup cost: `-X importtime` of the app modules, then time to first response of a freshly started
+# server against the stub LLM: spawn -> first /greet answered (listening), and the first /chat.
+# gunicorn runs are also measured with --preload, memory is the PSS of master + workers.
+# usage: python benchmarks/startup_bench.py [--runs 3] [--workers 2] [--servers uvicorn gunicorn gunicorn-preload]
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from load_test import ROOT, free_port, wait_for
+
+MODULES = ["web", "chatbot", "flask", "langchain_groq", "langgraph.graph", "langchain_core.messages", "requests", "pydantic"]
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--runs", type=int, default=3, help="fresh starts per server, the median is reported")
+parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+parser.add_argument("--servers", nargs="+", default=["uvicorn", "gunicorn", "gunicorn-preload"],
+                    choices=["uvicorn", "gunicorn", "gunicorn-preload"])
+parser.add_argument("--no-warm-up", action="store_true", help="start with bot_config['startup']['warm_up'] off")
+parser.add_argument("--delay", type=float, default=0.0, help="seconds between listening and the first /chat")
+args = parser.parse_args()
+
+
+def import_times(module: str) -> dict:
+    # cumulative microseconds of the first import of each module in MODULES
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=tempfile.mkdtemp(),
+                          env={**os.environ, "PYTHONPATH": ROOT, "GROQ_API_KEY": "stub"}, capture_output=True, text=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$", line)
+        if match and match.group(2) not in times:
+            times[match.group(2)] = int(match.group(1))
+    return times
+
+
+def pss_bytes(pid: int) -> int:
+    # proportional set size of a process and its children: shared (copy-on-write) pages are split between them
+    total = 0
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as file:
+            for line in file:
+                if line.startswith("Pss:"):
+                    total += int(line.split()[1]) * 1024
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as file:
+                total += sum(pss_bytes(int(child)) for child in file.read().split())
+    except OSError:
+        pass
+    return total
+
+
+def server_code(server: str, port: int) -> str:
+    code = f"import sys, config; config.bot_config.setdefault('startup', {{}})['warm_up'] = {not args.no_warm_up}; "
+    if server == "uvicorn":
+        return code + f"import uvicorn; uvicorn.run('asgi:app', port={port}, log_level='warning')"
+    # the repo's gunicorn.conf.py, the Procfile runs from the root where gunicorn finds it by itself
+    argv = ["gunicorn", "-c", os.path.join(ROOT, "gunicorn.conf.py"), "--bind", f"127.0.0.1:{port}",
+            "--workers", str(args.workers), "--log-level", "warning", "web:app"]
+    if server == "gunicorn-preload":
+        argv.insert(1, "--preload")
+    return code + f"from gunicorn.app.wsgiapp import run; sys.argv = {argv!r}; run()"
+
+
+def start(server: str, stub_url: str) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT,
+        "GROQ_API_KEY": "stub",
+        "GROQ_API_BASE": stub_url,
+        "WEATHER_API_KEY": "stub",
+        "WEATHER_API_URL": stub_url + "/v1",
+    }
+    spawned = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", server_code(server, port)], cwd=tempfile.mkdtemp(), env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                if requests.post(url + "/greet", json={"user_id": "first"}, timeout=30).status_code == 200:
+                    break
+            except requests.ConnectionError:
+                time.sleep(0.01)
+            if proc.poll() is not None or time.perf_counter() - spawned > 60:
+                raise RuntimeError(f"{server} did not come up")
+        listening = time.perf_counter() - spawned
+        time.sleep(args.delay)
+
+        start_chat = time.perf_counter()
+        requests.post(url + "/chat", json={"user_id": "first", "message": "hello"}, timeout=60).raise_for_status()
+        first_chat = time.perf_counter() - start_chat
+        first_response = time.perf_counter() - spawned
+
+        start_chat = time.perf_counter()
+        requests.post(url + "/chat", json={"user_id": "second", "message": "hello"}, timeout=60).raise_for_status()
+        second_chat = time.perf_counter() - start_chat
+        time.sleep(1) # let the workers finish warming up before sizing them
+        return {"listening": listening, "first_chat": first_chat, "first_response": first_response,
+                "second_chat": second_chat, "pss": pss_bytes(proc.pid)}
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+for module in ("web", "asgi"):
+    times = import_times(module)
+    print(f"import {module}: {times.get(module, 0) / 1000:.0f} ms  (" +
+          ", ".join(f"{name} {times[name] / 1000:.0f}" for name in MODULES if name in times and name != module) + ")")
+
+walls = []
+for _ in range(args.runs):
+    start_wall = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import web"], cwd=tempfile.mkdtemp(), env={**os.environ, "PYTHONPATH": ROOT, "GROQ_API_KEY": "stub"})
+    walls.append(time.perf_counter() - start_wall)
+print(f"python -c 'import web': {statistics.median(walls) * 1000:.0f} ms wall, interpreter included\n")
+
+stub_port = free_port()
+stub = subprocess.Popen([sys.executable, os.path.join(HERE, "stub_server.py"), "--port", str(stub_port), "--latency", "0.05",
+                         "--tokens", "10", "--tokens-per-second", "1000"], stdout=subprocess.DEVNULL)
+try:
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    wait_for(stub_url + "/stats")
+    print(f"warm-up {'off' if args.no_warm_up else 'on'}, first /chat {args.delay:.1f} s after listening, "
+          f"median of {args.runs} starts, stub LLM 50 ms + 10 tokens")
+    print(f"{'':>18} {'listening':>10} {'1st chat':>10} {'1st resp':>10} {'2nd chat':>10} {'PSS':>9}")
+    for server in args.servers:
+        runs = [start(server, stub_url) for _ in range(args.runs)]
+        med = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{server:>18} {med['listening'] * 1000:>8.0f}ms {med['first_chat'] * 1000:>8.0f}ms "
+              f"{med['first_response'] * 1000:>8.0f}ms {med['second_chat'] * 1000:>8.0f}ms {med['pss'] / 2**20:>6.0f}MiB")
+finally:
+    stub.terminate()
+    stub.wait()
@@ -0,0 +1,60 @@
+# Per-write latency of the personal info storage as the number of users grows.
+# usage: python benchmarks/storage_bench.py [--users 100000] [--json]
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import LocalJSONStorage, SQLiteStorage
+
+
+def measure_writes(storage, user_prefix: str, samples: int) -> list:
+    latencies = []
+    for i in range(samples):
+        start = time.perf_counter()
+        storage.save_personal_info(f"{user_prefix}{i}", "hobbies", f"hobby {i}")
+        if hasattr(storage, "flush"):
+            storage.flush() # count the commit too, worst case for the batched writer
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def fill(storage, start: int, end: int):
+    entries = [(f"user_{i}", "name", f"Name {i}") for i in range(start, end)]
+    if hasattr(storage, "save_many"):
+        storage.save_many(entries)
+        storage.flush()
+    else:
+        for entry in entries:
+            storage.save_personal_info(*entry)
+
+
+def run(storage, checkpoints, samples):
+    filled = 0
+    print(f"{'users':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for users in checkpoints:
+        fill(storage, filled, users)
+        filled = users
+        latencies = sorted(measure_writes(storage, f"probe_{users}_", samples))
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(f"{users:>10} {statistics.median(latencies):>10.3f} {p99:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="also run the old JSON storage (slow, capped at 2k users)")
+    args = parser.parse_args()
+
+    checkpoints = [n for n in (1_000, 2_000, 10_000, 100_000, 1_000_000) if n <= args.users]
+    with tempfile.TemporaryDirectory() as tmp:
+        print("SQLiteStorage")
+        run(SQLiteStorage(os.path.join(tmp, "bench.db"), flush_interval=0), checkpoints, args.samples)
+        if args.json:
+            print("\nLocalJSONStorage")
+            run(LocalJSONStorage(os.path.join(tmp, "bench.json")), [n for n in checkpoints if n <= 2_000], 20)
@@ -0,0 +1,139 @@
+# Local stand-in for the Groq chat completions API and weatherapi.com, for load tests without quota.
+# Point the app at it with GROQ_API_BASE=http://127.0.0.1:8400 and WEATHER_API_URL=http://127.0.0.1:8400/v1
+# usage: python benchmarks/stub_server.py [--port 8400] [--latency 0.2] [--tokens-per-second 250] [--tokens 60]
+#        [--model-latency llama-3.1-8b-instant=0.05 ...]
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+WORDS = (
+    "the a of and to in is that it for on with as this you be at by are from or an was can "
+    "answer question detail simple example useful here often best part way time people help"
+).split()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    options = None # argparse namespace, set in main
+    counters = {"chat": 0, "chat_stream": 0, "weather": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    counters_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/v1/current.json":
+            return self._weather(parse_qs(url.query).get("q", [""])[0])
+        if url.path == "/stats":
+            with self.counters_lock:
+                return self._send_json(dict(self.counters))
+        self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            return self._send_json({"error": "not found"}, 404)
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        messages = body.get("messages", [])
+        content = self._reply(messages)
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+        completion_tokens = len(content.split())
+        with self.counters_lock:
+            self.counters["chat_stream" if body.get("stream") else "chat"] += 1
+            self.counters["prompt_tokens"] += prompt_tokens
+            self.counters["completion_tokens"] += completion_tokens
+
+        latency = self.options.model_latency.get(body.get("model"), self.options.latency)
+        if body.get("stream"):
+            return self._stream(body.get("model", "stub"), content, latency)
+
+        time.sleep(latency + completion_tokens / self.options.tokens_per_second)
+        self._send_json({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    def _reply(self, messages: list) -> str:
+        system = str(messages[0].get("content", "")) if messages else ""
+        # the app's structured prompts get valid, empty answers
+        if '"facts"' in system:
+            return '{"facts": []}'
+        if "tool parser" in system:
+            return '{"tool": "none", "params": {}, "confidence": 0.9, "context_used": false}'
+        rng = random.Random(str(messages[-1].get("content", "")) if messages else "")
+        return " ".join(rng.choice(WORDS) for _ in range(self.options.tokens)).capitalize() + "."
+
+    def _stream(self, model: str, content: str, latency: float):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+        time.sleep(latency)
+        for i, word in enumerate(content.split()):
+            delta = {"role": "assistant", "content": word if i == 0 else f" {word}"}
+            self._event({"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                         "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+            time.sleep(1 / self.options.tokens_per_second)
+        self._event({"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def _event(self, payload: dict):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+        self.wfile.flush()
+
+    def _weather(self, city: str):
+        with self.counters_lock:
+            self.counters["weather"] += 1
+        time.sleep(self.options.weather_latency)
+        digest = int(hashlib.md5(city.lower().encode()).hexdigest(), 16)
+        self._send_json({
+            "location": {"name": city},
+            "current": {"temp_c": round(-5 + (digest % 400) / 10, 1), "is_day": digest % 2, "condition": {"text": "Partly cloudy"}},
+        })
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8400)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=250)
+    parser.add_argument("--tokens", type=int, default=60, help="words per chat reply")
+    parser.add_argument("--weather-latency", type=float, default=0.1)
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=SECONDS",
+                        help="time to first token for one model, e.g. llama-3.1-8b-instant=0.05")
+    StubHandler.options = parser.parse_args(argv)
+    StubHandler.options.model_latency = {
+        model: float(seconds) for model, seconds in (item.split("=", 1) for item in StubHandler.options.model_latency)
+    }
+
+    server = ThreadingHTTPServer((StubHandler.options.host, StubHandler.options.port), StubHandler)
+    server.daemon_threads = True
+    print(f"Stub LLM/weather server on http://{StubHandler.options.host}:{StubHandler.options.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Cost of the telemetry: a bare span in a tight loop, and full chat turns (offline model)
+# with telemetry on and off, to check that disabling it costs next to nothing.
+# usage: python benchmarks/telemetry_bench.py [--turns 300] [--spans 200000]
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "bench")
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--turns", type=int, default=300)
+parser.add_argument("--spans", type=int, default=200000)
+args = parser.parse_args()
+os.chdir(tempfile.mkdtemp())
+
+import chatbot
+import telemetry
+from weather import StubWeatherProvider, set_weather_provider
+
+chatbot.set_llm("core_llm", GenericFakeChatModel(messages=itertools.cycle(["Sure, here is an answer."])))
+chatbot.set_llm("personal_info", GenericFakeChatModel(messages=itertools.cycle(['{"facts": []}'])))
+# every turn on the fake core_llm, short ones would otherwise go to a real small_llm
+chatbot.bot_config["model_routing"]["enabled"] = False
+set_weather_provider(StubWeatherProvider())
+
+MESSAGES = ["Why is the sky blue?", "What's the weather in London?", "Tell me a joke", "what time is it", "I live in Pune"]
+
+out = sys.stdout
+sys.stdout = open(os.devnull, "w")
+
+
+def span_ns(enabled: bool) -> float:
+    telemetry.enabled = enabled
+    _, token = telemetry.start_trace()
+    start = time.perf_counter_ns()
+    for _ in range(args.spans):
+        with telemetry.span("bench"):
+            pass
+    elapsed = time.perf_counter_ns() - start
+    telemetry.end_trace(token)
+    return elapsed / args.spans
+
+
+def turns_ms(enabled: bool, user: str) -> float:
+    # a fresh user each run, so every run replays the same conversation length
+    telemetry.enabled = enabled
+    bot = chatbot.ChatBotLangchain(user)
+    bot.get_response("hello", bot.user_id) # warm-up
+    start = time.perf_counter()
+    for i in range(args.turns):
+        _, token = telemetry.start_trace()
+        bot.get_response(MESSAGES[i % len(MESSAGES)], bot.user_id)
+        trace = telemetry.end_trace(token, "/chat")
+        if trace is not None:
+            span_counts.append(len(trace["spans"]))
+    return (time.perf_counter() - start) / args.turns * 1000
+
+
+span_counts = []
+
+
+spans = {enabled: span_ns(enabled) for enabled in (False, True)}
+turns_ms(True, "warm-up") # the first session pays for table setup
+# alternate on/off runs and keep the best of each, so drift on a shared machine cancels out
+runs = [(enabled, turns_ms(enabled, f"bench-{i}")) for i, enabled in enumerate([False, True] * 3)]
+turns = {enabled: min(ms for on, ms in runs if on == enabled) for enabled in (False, True)}
+
+print(f"span: {spans[False]:.0f} ns disabled, {spans[True]:.0f} ns enabled ({args.spans} iterations)", file=out)
+print(f"chat turn ({args.turns} turns, offline model): {turns[False]:.3f} ms disabled, {turns[True]:.3f} ms enabled "
+      f"({(turns[True] - turns[False]) / turns[False]:+.1%})", file=out)
+per_turn = sum(span_counts) / len(span_counts)
+print(f"{per_turn:.1f} spans per turn, about {per_turn * (spans[True] - spans[False]) / 1000:.0f} us of telemetry per turn "
+      f"(the turn delta above also includes run-to-run noise)", file=out)
+print(f"metrics page: {len(telemetry.render().splitlines())} lines", file=out)
@@ -0,0 +1,56 @@
+# Multi-tool turns: "weather in <n cities> and the time" with a weather upstream taking --latency
+# seconds (cache off), run one call after another vs tools.run_tools, and with one city hanging
+# to show the per-tool timeout bounding the turn.
+# usage: python benchmarks/tools_bench.py [--cities 4] [--latency 0.3] [--timeout 1]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tools
+from weather import StubWeatherProvider, set_weather_provider
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--cities", type=int, default=4)
+parser.add_argument("--latency", type=float, default=0.3)
+parser.add_argument("--timeout", type=float, default=1.0, help="weather tool timeout for the hanging run")
+args = parser.parse_args()
+
+CITIES = ["London", "Tokyo", "Pune", "Lima", "Oslo", "Lagos", "Austin", "Berlin"]
+
+
+class SlowWeather(StubWeatherProvider):
+    def current(self, city: str) -> dict:
+        time.sleep(60 if city == "Nowhere" else args.latency)
+        return super().current(city)
+
+
+set_weather_provider(SlowWeather(), ttl=0, stale_ttl=0)
+out = sys.stdout
+sys.stdout = open(os.devnull, "w")
+
+calls = [{"tool": "weather", "params": {"city": CITIES[i % len(CITIES)]}} for i in range(args.cities)]
+calls.append({"tool": "time", "params": {}})
+
+start = time.perf_counter()
+for call in calls:
+    tools.run_tools([call])
+sequential = time.perf_counter() - start
+
+start = time.perf_counter()
+answers = tools.run_tools(calls)
+parallel = time.perf_counter() - start
+
+tools.registry["weather"].timeout = args.timeout
+start = time.perf_counter()
+hung = tools.run_tools(calls[:-1] + [{"tool": "weather", "params": {"city": "Nowhere"}}] + calls[-1:])
+bounded = time.perf_counter() - start
+
+print(f"{len(calls)} tool calls ({args.cities} x weather at {args.latency * 1000:.0f} ms + time)", file=out)
+print(f"one after another  {sequential * 1000:>7.0f} ms", file=out)
+print(f"run_tools parallel {parallel * 1000:>7.0f} ms, {sum(not a.startswith('Sorry') for a in answers)}/{len(calls)} answered", file=out)
+print(f"one city hanging   {bounded * 1000:>7.0f} ms with a {args.timeout:.1f} s weather timeout, "
+      f"{sum(a.startswith('Sorry, the weather tool took too long') for a in hung)} timed out", file=out)
+os._exit(0) # don't wait for the hanging call
@@ -1,38 +1,37 @@
 # langchain chatbot
-from langchain_core.messages import HumanMessage, RemoveMessage, SystemMessage, AIMessage
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph import START, MessagesState, StateGraph
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.messages import HumanMessage, RemoveMessage, SystemMessage, AIMessage, AIMessageChunk, messages_from_dict, messages_to_dict
+from langgraph.graph import START, StateGraph
 from langchain_groq import ChatGroq
-from typing import Dict, Any, List, Optional
-from pydantic import BaseModel, Field
+from typing import Dict, Callable, List, Optional
 
 # system imports
 from uuid import uuid4
-import json
-import os
-from threading import Thread
-from datetime import datetime
-import requests
+import asyncio
+import queue
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import httpx
 
 # config
 from config import bot_config
+import telemetry
+from storage import get_storage
+from user_index import get_user_index
+from checkpoint import get_checkpointer, is_durable
+from response_cache import get_response_cache
+from router import IntentRouter
+from tools import Tool, ToolParameter, arun_tools, registry as tools_registry, run_tools
+import model_router
+from background import get_queue
+from extraction import ExtractionScheduler, parse_json_object
+from memory import UserMemory
+from context import ChatState, UserContextCache, build_prompt, needs_summary, summarise_thread
 
 # env
 from dotenv import load_dotenv
-load_dotenv()
-
-#tools to be used deterministic
-class ToolParameter(BaseModel):
-    name: str
-    description: str
-    required: bool = False
-    default: Optional[Any] = None
-
-class Tool(BaseModel):
-    name: str
-    description: str
-    parameters: List[ToolParameter]
-    examples: List[str]
 
 #Personal Info List
 personal_info_list = [
@@ -45,134 +44,23 @@ personal_info_list = [
             "devices", "apps", "personal_goals", "career_goals"
         ]
 
-# using local storage for now, will move to NoSQL later or Vector DB
-class LocalJSONStorage:
-    def __init__(self, file_path="personal_info.json"):
-        self.file_path = file_path
-        if not os.path.exists(file_path):
-            with open(file_path, "w") as file:
-                json.dump({}, file)
-
-    def save_personal_info(self, user_id: str, info_type: str, info: str):
-        # Load existing data
-        with open(self.file_path, "r") as file:
-            data = json.load(file)
-        
-        # update the data
-        if user_id not in data:
-            data[user_id] = {}
-        if info_type not in data[user_id]:
-            data[user_id][info_type] = []
-        
-        # no duplicates
-        if info not in data[user_id][info_type]:
-            data[user_id][info_type].append(info)
-    
-        with open(self.file_path, "w") as file:
-            json.dump(data, file, indent=4)
-
+# the tool router prompt is rendered once per registry version, only the user context is filled in per user
+USER_CONTEXT_SLOT = "<<user_context>>"
 
-    def load_personal_info(self, user_id: str, info_type: str = None):
-        # Load existing data
-        with open(self.file_path, "r") as file:
-            data = json.load(file)
-        
-        if info_type == "all":
-            return data.get(user_id, {})
+def _render_tool_router_prompt(tools_registry: dict) -> str:
+    tools_context = "\n\n".join([
+        f"Tool: {tool.name}\n"
+        f"Description: {tool.description}\n"
+        f"Parameters: {[p.name for p in tool.parameters]}\n"
+        f"Example queries:\n" + "\n".join([f"- {ex}" for ex in tool.examples])
+        for tool in tools_registry.values()
+    ])
 
-        # Retrieve the user's data
-        if user_id not in data:
-            return None
-        if info_type:
-            return data[user_id].get(info_type, [])
-        return data[user_id]
-    
-    def get_all_users(self):
-        with open(self.file_path, "r") as file:
-            data = json.load(file)
-        return list(data.keys())
-        
-class ChatBotLangchain:
-    def __init__(self, user_id: str):
-        self.llm = ChatGroq(model=bot_config["model"]["core_llm"]["name"]) # api key is in env
-        self.llm_personal_info = ChatGroq(model=bot_config["model"]["personal_info"]["name"]) # api key is in env
-        
-        self.workflow = StateGraph(state_schema=MessagesState)
-        self.workflow.add_node("model", self._call_model)
-        self.workflow.add_edge(START, "model")
-        
-        self.memory = MemorySaver()
-        self.app = self.workflow.compile(checkpointer=self.memory)
-        
-        self.thread_id = str(uuid4())
-        self.user_id = user_id
-        self.storage = LocalJSONStorage()
-
-        self.system_prompt = (bot_config["bot"]["prompt"]["system"])
-        self.user_context = self.parse_user_personal_info(self.user_id)
-        if self.user_context:
-            self.system_prompt += f"\n\nUser Information:\n{self.user_context}"
-
-        self.available_tools = {
-            "weather": self.get_weather,
-            "time": self.get_current_time,
-            # "news": self.get_news # will add later
-        }
-
-        self.tools_registry = {
-        "weather": Tool(
-            name="weather",
-            description="Get current weather information for a location",
-            parameters=[
-                ToolParameter(
-                    name="city",
-                    description="The city name to get weather for",
-                    required=True
-                )
-            ],
-            examples=[
-                "What's the weather in London?",
-                "How's the weather today in New York?",
-                "Tell me the weather in Tokyo"
-            ]
-        ),
-        "time": Tool(
-            name="time", 
-            description="Get the current time",
-            parameters=[],
-            examples=[
-                "What time is it?",
-                "Tell me the current time",
-                "What's the time now?"
-            ]
-        )
-    }
-
-    def greet(self, user_id: str) -> str:
-        print(user_id)
-        print(user_id in self.storage.get_all_users())
-        if user_id not in self.storage.get_all_users():
-            return "Hello! How can I help you today?"
-        
-        name = self.storage.load_personal_info(user_id, "name")
-        if name:
-            return f"Hello {name[0]}! How can I help you today?"
-        
-    # Functions to handel Weather inquiries and Time inquiries
-    def _check_tool_query(self, user_input: str) -> dict:
-        tools_context = "\n\n".join([
-            f"Tool: {tool.name}\n"
-            f"Description: {tool.description}\n"
-            f"Parameters: {[p.name for p in tool.parameters]}\n"
-            f"Example queries:\n" + "\n".join([f"- {ex}" for ex in tool.examples])
-            for tool in self.tools_registry.values()
-        ])
-
-        system_prompt = f"""
+    return f"""
 You are a tool parser that analyzes user input to detect tool requests.
 
 User Context:
-{self.user_context}
+{USER_CONTEXT_SLOT}
 
 Available tools and their specifications:
 {tools_context}
@@ -193,171 +81,342 @@ Output format:
         "param1": "value1",
         ...
     }},
+    "calls": [{{"tool": "<tool_name>", "params": {{...}}}}, ...],
     "confidence": <float between 0 and 1>,
     "context_used": <boolean>
 }}
 
+"calls" lists every tool call when the user asks for several things (e.g. the weather in two cities and the time),
+"tool" and "params" are then the first of them.
 Return 'none' if no tool is requested or if required parameters are missing.
     """
+
+# Process wide LLM clients and chat graph, shared by all sessions.
+# Per-user state goes through the graph config (thread_id, system_prompt).
+_shared = {}
+_shared_lock = Lock()
+
+def _http_client() -> httpx.Client:
+    cfg = bot_config["http"]
+    if "http_client" not in _shared:
+        _shared["http_client"] = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=cfg["max_connections"],
+                max_keepalive_connections=cfg["max_keepalive_connections"],
+            ),
+            timeout=cfg["timeout"],
+        )
+    return _shared["http_client"]
+
+def get_tool_router():
+    """(IntentRouter, LLM router prompt) for the shared tool registry, rebuilt when tools are registered."""
+    cached = _shared.get("tool_router")
+    if cached is None or cached[0] != tools_registry.version:
+        with _shared_lock:
+            cached = _shared.get("tool_router")
+            if cached is None or cached[0] != tools_registry.version:
+                cached = _shared["tool_router"] = (
+                    tools_registry.version, IntentRouter(tools_registry), _render_tool_router_prompt(tools_registry),
+                )
+    return cached[1], cached[2]
+
+def get_llm(name: str) -> ChatGroq:
+    """Shared ChatGroq client for a `bot_config["model"]` entry (core_llm, small_llm, personal_info)."""
+    key = f"llm:{name}"
+    if key not in _shared:
+        with _shared_lock:
+            if key not in _shared:
+                load_dotenv() # GROQ_API_KEY, read when the first client is built rather than at import
+                cfg = bot_config["model"][name]
+                _shared[key] = ChatGroq(
+                    model=cfg["name"], # api key is in env
+                    max_tokens=cfg["max_tokens"],
+                    temperature=cfg["temperature"],
+                    http_client=_http_client(),
+                )
+    return _shared[key]
+
+def set_llm(name: str, llm):
+    """Replace the client for a `bot_config["model"]` entry with any LangChain chat model (fakes, other providers).
+    Call it before sessions are created, they keep the client they started with."""
+    with _shared_lock:
+        _shared[f"llm:{name}"] = llm
+
+def get_extraction_scheduler() -> ExtractionScheduler:
+    """Shared scheduler batching personal info extraction across turns and users."""
+    if "extraction" not in _shared:
+        with _shared_lock:
+            if "extraction" not in _shared:
+                _shared["extraction"] = ExtractionScheduler(
+                    lambda: get_llm("personal_info"), get_storage, personal_info_list,
+                )
+    return _shared["extraction"]
+
+def get_user_context_cache() -> UserContextCache:
+    if "user_context" not in _shared:
+        with _shared_lock:
+            if "user_context" not in _shared:
+                _shared["user_context"] = UserContextCache(bot_config["conversation"]["context_cache_size"])
+    return _shared["user_context"]
+
+def get_chat_app():
+    """Single compiled chat graph with one checkpointer (sqlite by default, shared by all workers), conversations are kept apart by thread_id."""
+    if "app" not in _shared:
+        with _shared_lock:
+            if "app" not in _shared:
+                workflow = StateGraph(state_schema=ChatState)
+                workflow.add_node("model", RunnableLambda(_call_model, afunc=_acall_model))
+                workflow.add_edge(START, "model")
+                _shared["memory"] = get_checkpointer()
+                _shared["app"] = workflow.compile(checkpointer=_shared["memory"])
+    return _shared["app"]
+
+telemetry.register_gauge(
+    "chatbot_cache_lookups", "Cache lookups by cache and result",
+    telemetry.stats_collector(lambda: "user_context" in _shared and _shared["user_context"].stats(), ["hits", "misses"], cache="user_context"),
+)
+telemetry.register_gauge(
+    "chatbot_extraction_events", "Personal info extraction turns, batches and facts so far",
+    telemetry.stats_collector(lambda: "extraction" in _shared and _shared["extraction"].stats(), ["turns", "skipped", "batches", "facts", "duplicates", "errors"]),
+)
+
+# the tier comes from the graph config (model_router.choose_tier), a weak small model
+# reply is regenerated by core_llm (stream_response tells the two apart by the "escalated" tag)
+def _call_model(state: ChatState, config: RunnableConfig):
+    configurable = config["configurable"]
+    tier = configurable.get("model_tier", "core_llm")
+    prompt = build_prompt(state, configurable.get("system_prompt", bot_config["bot"]["prompt"]["system"]))
+    _schedule_summary(state, config)
+    message = _invoke_tier(tier, prompt)
+    if configurable.get("escalate", True) and model_router.needs_escalation(tier, message):
+        message = _invoke_tier("core_llm", prompt, escalated=True)
+    return {"messages": message}
+
+async def _acall_model(state: ChatState, config: RunnableConfig):
+    configurable = config["configurable"]
+    tier = configurable.get("model_tier", "core_llm")
+    prompt = build_prompt(state, configurable.get("system_prompt", bot_config["bot"]["prompt"]["system"]))
+    _schedule_summary(state, config)
+    message = await _ainvoke_tier(tier, prompt)
+    if configurable.get("escalate", True) and model_router.needs_escalation(tier, message):
+        message = await _ainvoke_tier("core_llm", prompt, escalated=True)
+    return {"messages": message}
+
+SENTENCE_END = re.compile(r"[.!?:]\s|\n")
+
+def _sentence_done(text: str) -> bool:
+    # enough of a streamed small model reply to tell whether it hedges
+    return bool(SENTENCE_END.search(text)) or len(text) >= bot_config["model_routing"]["stream_hold_chars"]
+
+def _tier_tags(tier: str, escalated: bool) -> list:
+    return [tier, "escalated"] if escalated else [tier]
+
+def _invoke_tier(tier: str, messages: list, stage: str = "chat", escalated: bool = False):
+    start = time.perf_counter()
+    with telemetry.span("model" if stage == "chat" else f"{stage}_llm"):
+        message = get_llm(tier).invoke(messages, config={"tags": _tier_tags(tier, escalated)})
+    model_router.usage.record(tier, time.perf_counter() - start, message, escalated)
+    telemetry.record_tokens(stage, message)
+    return message
+
+async def _ainvoke_tier(tier: str, messages: list, stage: str = "chat", escalated: bool = False):
+    start = time.perf_counter()
+    with telemetry.span("model" if stage == "chat" else f"{stage}_llm"):
+        message = await get_llm(tier).ainvoke(messages, config={"tags": _tier_tags(tier, escalated)})
+    model_router.usage.record(tier, time.perf_counter() - start, message, escalated)
+    telemetry.record_tokens(stage, message)
+    return message
+
+def _schedule_summary(state: ChatState, config: RunnableConfig):
+    # the rolling summary is updated off the request path, the prompt only ever
+    # holds the summary plus a token-bounded window of recent messages
+    system_prompt = config["configurable"].get("system_prompt", bot_config["bot"]["prompt"]["system"])
+    if needs_summary(state, system_prompt):
+        thread_config = {"configurable": {"thread_id": config["configurable"]["thread_id"], "system_prompt": system_prompt}}
+        get_queue("summary").submit(summarise_thread, get_chat_app(), get_llm("core_llm"), thread_config)
+
+def _batch_chains(items: List[dict]):
+    # batch items grouped per user in request order, plus error results for malformed items
+    chains: Dict[str, list] = {}
+    errors = []
+    for index, item in enumerate(items):
+        user_id = item.get("user_id") if isinstance(item, dict) else None
+        message = item.get("message") if isinstance(item, dict) else None
+        if not user_id or not message:
+            errors.append({"index": index, "user_id": user_id, "error": "user_id and message are required"})
+            continue
+        chains.setdefault(str(user_id), []).append((index, str(message)))
+    return chains, errors
+
+class ChatBotLangchain:
+    # a session is only a handle: user id and thread id, the user context comes from a shared cache
+    # the thread id is derived from the user id, so any worker (or a restarted one) picks up the same conversation
+    def __init__(self, user_id: str):
+        self.llm = get_llm("core_llm")
+        self.app = get_chat_app()
+
+        self.thread_id = f"user:{user_id}"
+        self.user_id = user_id
+        self.storage = get_storage()
+
+        self.tools_registry = tools_registry
+
+    def _rendered_context(self) -> dict:
+        # rebuilt only when storage reports a new version for this user
+        return get_user_context_cache().get(self.user_id, self.storage, self._render_context)
+
+    def _render_context(self, user_id: str, previous: dict = None) -> dict:
+        memory = UserMemory(self.storage.load_personal_info(user_id, "all"), previous=previous and previous["memory"])
+        return {"memory": memory}
+
+    def _context_for(self, user_input: str = "") -> dict:
+        # only the facts relevant to this message go into the prompts
+        with telemetry.span("context"):
+            facts = self._rendered_context()["memory"].retrieve(user_input)
+        user_context = self.parse_user_personal_info(self.user_id, facts) if facts else ""
+        system_prompt = bot_config["bot"]["prompt"]["system"]
+        if user_context:
+            system_prompt += f"\n\nUser Information:\n{user_context}"
+        return {
+            "user_context": user_context,
+            "system_prompt": system_prompt,
+            "tool_prompt": get_tool_router()[1].replace(USER_CONTEXT_SLOT, user_context),
+        }
+
+    @property
+    def user_context(self) -> str:
+        return self._context_for()["user_context"]
+
+    @property
+    def system_prompt(self) -> str:
+        return self._context_for()["system_prompt"]
+
+    def greet(self, user_id: str) -> str:
+        # served from the in-memory user index, /greet calls it without a session
+        return get_user_index().greeting(user_id)
+
+    # Functions to handel Weather inquiries and Time inquiries
+    def _check_tool_query(self, user_input: str, context: dict = None) -> dict:
+        # obvious cases are routed locally, the LLM router is only asked when unsure
+        result = self._local_tool_query(user_input)
+        if result is not None:
+            return result
+
         try:
-            response = self.llm.invoke([
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_input)
-            ])
-            
-            result = json.loads(response.content)
-            
-            # Validate parameters if tool is detected
-            if result["tool"] != "none":
-                tool = self.tools_registry[result["tool"]]
-                required_params = {p.name for p in tool.parameters if p.required}
-                provided_params = set(result["params"].keys())
-                
-                # Try to fill missing parameters from user context
-                if not required_params.issubset(provided_params):
-                    if "city" in required_params and "location" in self.user_context:
-                        result["params"]["city"] = self.storage.load_personal_info(self.user_id, "location")[0]
-                        result["context_used"] = True
-                
-                # Final validation
-                if not required_params.issubset(set(result["params"].keys())):
-                    missing = required_params - set(result["params"].keys())
-                    print(f"Missing required parameters: {missing}")
-                    return {"tool": "none", "params": {}, "confidence": 0, "context_used": False}
-                    
+            messages = self._tool_query_messages(user_input, context)
+            tier = model_router.tool_router_tier()
+            result = self._parse_tool_query(_invoke_tier(tier, messages, "router"))
+            if model_router.needs_router_escalation(tier, result):
+                result = self._parse_tool_query(_invoke_tier("core_llm", messages, "router", escalated=True))
+            if result is None:
+                raise ValueError("no JSON object in the tool router answer")
+            return self._validate_tool_params(result)
+        except Exception as e:
+            print(f"Tool parsing error: {str(e)}")
+            return {"tool": "none", "params": {}, "confidence": 0, "context_used": False}
+
+    async def _acheck_tool_query(self, user_input: str, context: dict = None) -> dict:
+        # routing and validation read storage, they run on a worker thread and keep the event loop free
+        result = await asyncio.to_thread(self._local_tool_query, user_input)
+        if result is not None:
             return result
+
+        try:
+            context = context or await asyncio.to_thread(self._context_for, user_input)
+            messages = self._tool_query_messages(user_input, context)
+            tier = model_router.tool_router_tier()
+            result = self._parse_tool_query(await _ainvoke_tier(tier, messages, "router"))
+            if model_router.needs_router_escalation(tier, result):
+                result = self._parse_tool_query(await _ainvoke_tier("core_llm", messages, "router", escalated=True))
+            if result is None:
+                raise ValueError("no JSON object in the tool router answer")
+            return await asyncio.to_thread(self._validate_tool_params, result)
         except Exception as e:
             print(f"Tool parsing error: {str(e)}")
             return {"tool": "none", "params": {}, "confidence": 0, "context_used": False}
-        
-    def execute_tool(self, tool_name: str, params: dict) -> str:
-        """Execute tool with parameter validation"""
+
+    def _local_tool_query(self, user_input: str) -> Optional[dict]:
+        # None when the local router is not confident enough
+        threshold = bot_config["router"]["local_confidence"]
+        with telemetry.span("router_local"):
+            result = get_tool_router()[0].classify_many(user_input, threshold)
+        if result["confidence"] < threshold:
+            return None
         try:
-            if tool_name not in self.available_tools:
-                return f"Tool '{tool_name}' not found."
-            
-            tool = self.tools_registry[tool_name]
-            valid_params = {}
-            
-            for param in tool.parameters:
-                if param.name in params:
-                    valid_params[param.name] = params[param.name]
-                elif param.default is not None:
-                    valid_params[param.name] = param.default
-                    
-            tool_func = self.available_tools[tool_name]
-            result = tool_func(**valid_params)
-            return result
+            return self._validate_tool_params(result)
         except Exception as e:
-            print(f"Tool execution error: {str(e)}")
-            return f"Sorry, I encountered an error while using the {tool_name} tool."
+            print(f"Tool parsing error: {str(e)}")
+            return {"tool": "none", "params": {}, "confidence": 0, "context_used": False}
 
-    def get_weather(self, city: str = None) -> str:
+    def _parse_tool_query(self, response) -> Optional[dict]:
         try:
-            if not city:
-                # naive implementation, Will improve later with vector embeddings
-                city = self.storage.load_personal_info(self.user_id, "location")
+            result = parse_json_object(response.content)
+        except ValueError:
+            return None
+        return result if isinstance(result, dict) and "tool" in result else None
 
-            print(f"Fetching weather for {city}")
-            
+    def _tool_query_messages(self, user_input: str, context: dict = None) -> list:
+        context = context or self._context_for(user_input)
+        return [
+            SystemMessage(content=context["tool_prompt"]),
+            HumanMessage(content=user_input)
+        ]
+
+    def _validate_tool_params(self, result: dict) -> dict:
+        # Validate parameters of every call if a tool is detected, result["calls"] keeps the valid ones
+        if result["tool"] != "none":
+            calls = result.get("calls") or [{"tool": result["tool"], "params": result.get("params") or {}}]
+            valid_calls = []
+            for call in calls:
+                tool = self.tools_registry.get(call.get("tool"))
+                if tool is None:
+                    print(f"Unknown tool: {call.get('tool')}")
+                    continue
+                params = dict(call.get("params") or {})
+                required_params = {p.name for p in tool.parameters if p.required}
+
+                # Try to fill missing parameters from user context
+                if "city" in required_params - set(params.keys()):
+                    location = self.storage.load_personal_info(self.user_id, "location")
+                    if location:
+                        params["city"] = location[0]
+                        result["context_used"] = True
+
+                # Final validation
+                if not required_params.issubset(set(params.keys())):
+                    missing = required_params - set(params.keys())
+                    print(f"Missing required parameters: {missing}")
+                    continue
+                valid_calls.append({"tool": tool.name, "params": params})
+
+            if not valid_calls:
+                return {"tool": "none", "params": {}, "confidence": 0, "context_used": False}
+            result.update(tool=valid_calls[0]["tool"], params=valid_calls[0]["params"], calls=valid_calls)
+
+        return result
+
+    def execute_tool(self, tool_name: str, params: dict) -> str:
+        """Execute tool with parameter validation"""
+        return self.execute_tools([{"tool": tool_name, "params": params}])
+
+    def execute_tools(self, calls: List[dict]) -> str:
+        """Run the calls of a routed turn in parallel (see tools.run_tools) and join their answers."""
+        return " ".join(run_tools(calls))
+
+    async def aexecute_tools(self, calls: List[dict]) -> str:
+        return " ".join(await arun_tools(calls))
 
-            api_key = os.getenv("WEATHER_API_KEY")
-            url = "http://api.weatherapi.com/v1"
-            complete_url = f"{url}/current.json?key={api_key}&q={city}"
-            response = requests.get(complete_url)
-            response.raise_for_status()  # Raise exception for bad status codes
-            
-            data = response.json()
-            temp_c = data['current']['temp_c']
-            time = "night" if data['current']['is_day'] == 0 else "day"
-            condition = data['current']['condition']['text']
-            
-            return f"The temperature in {city} is {temp_c}°C. It is {time} time and the weather condition is {condition}."
-        except requests.RequestException as e:
-            print(f"Weather API error: {str(e)}")
-            return f"Sorry, I couldn't fetch the weather for {city}."
-
-    def get_current_time(self) -> str:
-        now = datetime.now()
-        current_time = now.strftime("%H:%M:%S")
-        return f"The current time is {current_time}."
-        
-    
-    #Post Procesing of the response - TODO in thread
-    def _check_and_add_personal_info(self, human_message: str, response: str, user_id: str) -> bool:
-        # System prompt for the LLM
-        system_prompt = """
-Your job is to analyze a brief conversation and extract any details about a person's personal life, 
-categorized as follows:
-{}
-
-Follow these steps:
-1. Check the conversation for any details matching the above categories.
-2. If no details are found, respond with "NO PERSONAL INFORMATION".
-3. If personal information is found, return each identified piece in the format:
-"<Category>: <Detail>".
-
-Do not provide any additional commentary or explanation. Be precise and structured. Only return the detected information.
-""".format("\n".join(personal_info_list))
-
-        # Combine chat history
-        recent_chat = f"""
-Human: {human_message}
-AI: {response}
-"""
-        detected_info = self.llm_personal_info.invoke(
-            [SystemMessage(content=system_prompt), HumanMessage(content=recent_chat)]
-        ).content.strip()
-
-        print("Detected Info:", detected_info)
-
-        # Check if any personal information was detected
-        if detected_info.upper() == "NO PERSONAL INFORMATION":
-            return False
-
-        # Parse and save personal information
-        personal_info_entries = self._parse_detected_info(detected_info)
-        for category, detail in personal_info_entries:
-            print(f"Category: {category}, Detail: {detail}")
-            self.save_personal_info(user_id, category, detail)
-
-        return True
-
-    def _parse_detected_info(self, detected_info: str) -> list:
-        entries = []
-        for line in detected_info.split("\n"):
-            if ": " in line:
-                category, detail = line.split(": ", 1)
-                entries.append((category.strip(), detail.strip()))
-        return entries
-    
     def save_personal_info(self, user_id: str, info_type: str, info: str):
         if info_type not in personal_info_list:
             raise ValueError(f"Invalid info_type: {info_type}")
         self.storage.save_personal_info(user_id, info_type, info)
     
 
-    def _call_model(self, state: MessagesState):
-        system_message = SystemMessage(content=self.system_prompt)
-        message_history = state["messages"][:-1]
-        
-        if len(message_history) >= 120:
-            last_human_message = state["messages"][-1]
-            summary_prompt = "Distill the above chat messages into a single summary message. Include as many specific details as you can."
-            summary_message = self.llm.invoke(message_history + [HumanMessage(content=summary_prompt)])
-            delete_messages = [RemoveMessage(id=m.id) for m in state["messages"]]
-            human_message = HumanMessage(content=last_human_message.content)
-            response = self.llm.invoke([system_message, summary_message, human_message])
-            message_updates = [summary_message, human_message, response] + delete_messages
-        else:
-            message_updates = self.llm.invoke([system_message] + state["messages"])
-        
-        return {"messages": message_updates}
-    
-    def parse_user_personal_info(self, user_id: str) -> str:
+    def parse_user_personal_info(self, user_id: str, user_data: dict = None) -> str:
         try:
-            # Get all stored info for user
-            user_data = self.storage.load_personal_info(user_id, "all")
+            # Get all stored info for user, unless a subset is given
+            if user_data is None:
+                user_data = self.storage.load_personal_info(user_id, "all")
             if not user_data:
                 return ""
 
@@ -403,38 +462,305 @@ AI: {response}
             if other_info:
                 formatted_info.append("Other Information:\n" + "\n".join(other_info))
 
-            print("Formatted Info:", formatted_info)
-
             return "\n\n".join(formatted_info)
 
         except Exception as e:
             print(f"Error parsing personal info: {str(e)}")
             return ""
 
+    # conversation export/import, used by the session manager to spill idle sessions to disk
+    def _thread_config(self) -> dict:
+        return {"configurable": {"thread_id": self.thread_id}}
+
+    def _history(self) -> list:
+        return self.app.get_state(self._thread_config()).values.get("messages", [])
+
+    def export_conversation(self) -> dict:
+        if is_durable(self.app.checkpointer):
+            return {} # already on disk
+        values = self.app.get_state(self._thread_config()).values
+        messages = values.get("messages", [])
+        if not messages:
+            return {}
+        return {"summary": values.get("summary", ""), "messages": messages_to_dict(messages)}
+
+    def import_conversation(self, conversation: dict):
+        update = {"messages": messages_from_dict(conversation["messages"])}
+        if conversation.get("summary"):
+            update["summary"] = conversation["summary"]
+        self.app.update_state(self._thread_config(), update, as_node="model")
+
+    def release(self):
+        # an in-memory checkpointer is shared, drop this conversation from it
+        if not is_durable(self.app.checkpointer):
+            self.app.checkpointer.delete_thread(self.thread_id)
+
+    def history_size(self) -> int:
+        # bytes of conversation held in this process, none when it lives in a durable checkpointer
+        if is_durable(self.app.checkpointer):
+            return 0
+        values = self.app.get_state(self._thread_config()).values
+        return (sum(len(str(m.content)) for m in values.get("messages", [])) + len(values.get("summary", ""))) * 2
+
     def get_response(self, user_input: str, user_id: str) -> str:
         try:
-            self.user_context
-            tool_result = self._check_tool_query(user_input)
+            start = time.perf_counter()
+            cached = self._cached_response(user_input)
+            if cached is not None:
+                self.app.update_state(self._thread_config(), self._cached_turn(user_input, cached), as_node="model")
+                return cached
+
+            # built once per turn, shared by the tool router and the chat graph
+            context = self._context_for(user_input)
+            tool_result = self._check_tool_query(user_input, context)
             
             if tool_result["tool"] != "none":
-                return self.execute_tool(tool_result["tool"], tool_result["params"])
+                return self.execute_tools(tool_result["calls"])
 
             state = {"messages": [HumanMessage(content=user_input)]}
-            response = self.app.invoke(state, config={"configurable": {"thread_id": self.thread_id}})
+            response = self.app.invoke(state, config=self._chat_config(user_input, context))
             
             bot_response = response["messages"][-1].content
             if not bot_response or bot_response.lower() == "unknown":
                 return "I'm sorry, I don't have an answer to that question."
             
             # Check for personal information in background and save if found
-            thread = Thread(target=self._check_and_add_personal_info, args=(user_input, bot_response, user_id))
-            thread.start()
+            get_extraction_scheduler().add(user_id, user_input, bot_response)
+            self._store_response(user_input, bot_response, time.perf_counter() - start, context, response)
     
             return bot_response
             
         except Exception as e:
             print(f"Error: {str(e)}")
             return "I'm sorry, I encountered an error. Could you please try again?"
+
+    async def aget_response(self, user_input: str, user_id: str) -> str:
+        """
+        Async get_response. When the local router is unsure, the LLM router and the
+        chat graph are started together and the one that turns out not to be needed
+        is cancelled (and its turn removed from the history).
+        """
+        try:
+            start = time.perf_counter()
+            cached = self._cached_response(user_input)
+            if cached is not None:
+                await self.app.aupdate_state(self._thread_config(), self._cached_turn(user_input, cached), as_node="model")
+                return cached
+
+            human_message = HumanMessage(content=user_input, id=str(uuid4()))
+            # context and local routing read storage (and may flush it), not on the event loop
+            context = await asyncio.to_thread(self._context_for, user_input)
+            config = self._chat_config(user_input, context)
+            tool_result = await asyncio.to_thread(self._local_tool_query, user_input)
+
+            if tool_result is None:
+                route_task = asyncio.create_task(self._acheck_tool_query(user_input, context))
+                graph_task = asyncio.create_task(self.app.ainvoke({"messages": [human_message]}, config=config))
+                tool_result = await route_task
+                if tool_result["tool"] != "none":
+                    graph_task.cancel()
+                    try:
+                        await graph_task
+                    except (asyncio.CancelledError, Exception):
+                        pass
+                    await self._arollback_turn(config, human_message.id)
+                    return await self.aexecute_tools(tool_result["calls"])
+                response = await graph_task
+            elif tool_result["tool"] != "none":
+                return await self.aexecute_tools(tool_result["calls"])
+            else:
+                response = await self.app.ainvoke({"messages": [human_message]}, config=config)
+
+            bot_response = response["messages"][-1].content
+            if not bot_response or bot_response.lower() == "unknown":
+                return "I'm sorry, I don't have an answer to that question."
+
+            get_extraction_scheduler().add(user_id, user_input, bot_response)
+            self._store_response(user_input, bot_response, time.perf_counter() - start, context, response)
+            return bot_response
+
+        except Exception as e:
+            print(f"Error: {str(e)}")
+            return "I'm sorry, I encountered an error. Could you please try again?"
+
+    def stream_response(self, user_input: str, user_id: str):
+        """
+        Streaming get_response. Yields {"type": "token", "content": ...} events as the model
+        produces them and ends with {"type": "done", "response": ..., "ttft_ms": ..., "total_ms": ...}.
+        Tool and cached answers come back as a single token.
+        """
+        start = time.perf_counter()
+        ttft_ms = None
+        try:
+            bot_response = self._cached_response(user_input)
+            tool_result = {"tool": "none"}
+            if bot_response is None:
+                context = self._context_for(user_input)
+                tool_result = self._check_tool_query(user_input, context)
+
+            if bot_response is not None:
+                self.app.update_state(self._thread_config(), self._cached_turn(user_input, bot_response), as_node="model")
+                ttft_ms = (time.perf_counter() - start) * 1000
+                yield {"type": "token", "content": bot_response}
+            elif tool_result["tool"] != "none":
+                bot_response = self.execute_tools(tool_result["calls"])
+                ttft_ms = (time.perf_counter() - start) * 1000
+                yield {"type": "token", "content": bot_response}
+            else:
+                state = {"messages": [HumanMessage(content=user_input)]}
+                config = self._chat_config(user_input, context)
+                tier = config["configurable"]["model_tier"]
+                # a small model reply is held back until its first sentence shows it doesn't hedge. If it
+                # hedges, only core_llm's regenerated reply is streamed. If core_llm takes over after tokens
+                # were sent (cut off at max_tokens, a later hedge), a "reset" event tells the client to start over.
+                chunks = []
+                held = tier != "core_llm"
+                for chunk, metadata in self.app.stream(state, config=config, stream_mode="messages"):
+                    if not isinstance(chunk, AIMessageChunk) or not chunk.content:
+                        continue
+                    if "escalated" in metadata.get("tags", []) and tier != "core_llm":
+                        if not held:
+                            yield {"type": "reset"}
+                        tier, chunks, held = "core_llm", [], False
+                    chunks.append(chunk.content)
+                    if held:
+                        text = "".join(chunks)
+                        if not _sentence_done(text) or model_router.needs_escalation(tier, AIMessage(content=text)):
+                            continue # wait for more, or for core_llm
+                        held = False
+                        content = text
+                    else:
+                        content = chunk.content
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - start) * 1000
+                    yield {"type": "token", "content": content}
+
+                bot_response = "".join(chunks)
+                if held and bot_response:
+                    # short reply without a sentence end, or a hedge core_llm didn't replace (escalation off)
+                    ttft_ms = (time.perf_counter() - start) * 1000
+                    yield {"type": "token", "content": bot_response}
+                if not bot_response or bot_response.lower() == "unknown":
+                    bot_response = "I'm sorry, I don't have an answer to that question."
+                else:
+                    get_extraction_scheduler().add(user_id, user_input, bot_response)
+                    if get_response_cache() is not None:
+                        state = self.app.get_state(self._thread_config()).values
+                        self._store_response(user_input, bot_response, time.perf_counter() - start, context, state)
+
+        except Exception as e:
+            print(f"Error: {str(e)}")
+            bot_response = "I'm sorry, I encountered an error. Could you please try again?"
+
+        total_ms = (time.perf_counter() - start) * 1000
+        print(f"Stream timings: ttft {ttft_ms if ttft_ms is None else round(ttft_ms, 1)} ms, total {total_ms:.1f} ms")
+        yield {"type": "done", "response": bot_response, "ttft_ms": ttft_ms, "total_ms": total_ms}
+
+    # bulk answers for batch jobs: every user's messages run in order, users run concurrently
+    @classmethod
+    def batch_responses(cls, items: List[dict], get_session: Callable = None, max_concurrency: int = None):
+        """
+        Answer many {"user_id", "message"} items. Yields {"index", "user_id", "response"}
+        (or "error") as each turn finishes, at most `max_concurrency` users at a time.
+        `get_session(user_id)` returns the chatbot of a user, a new one by default.
+        """
+        get_session = get_session or cls
+        chains, errors = _batch_chains(items)
+        yield from errors
+        results = queue.Queue()
+
+        def run_chain(user_id: str, turns: list):
+            done = 0
+            try:
+                chatbot = get_session(user_id)
+                for index, message in turns:
+                    results.put({"index": index, "user_id": user_id, "response": chatbot.get_response(message, user_id)})
+                    done += 1
+            except Exception as e:
+                print(f"Batch error for {user_id}: {str(e)}")
+                for index, _ in turns[done:]:
+                    results.put({"index": index, "user_id": user_id, "error": str(e)})
+
+        pool = ThreadPoolExecutor(max_workers=max_concurrency or bot_config["batch"]["max_concurrency"])
+        try:
+            for user_id, turns in chains.items():
+                pool.submit(run_chain, user_id, turns)
+            for _ in range(sum(len(turns) for turns in chains.values())):
+                yield results.get()
+        finally:
+            # a closed generator (client went away) drops the turns that have not started
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    async def abatch_responses(cls, items: List[dict], get_session: Callable = None, max_concurrency: int = None):
+        """Async batch_responses, turns run on the event loop through aget_response."""
+        get_session = get_session or cls
+        chains, errors = _batch_chains(items)
+        for error in errors:
+            yield error
+        semaphore = asyncio.Semaphore(max_concurrency or bot_config["batch"]["max_concurrency"])
+        results = asyncio.Queue()
+
+        async def run_chain(user_id: str, turns: list):
+            done = 0
+            async with semaphore:
+                try:
+                    # session lookup may restore a spilled conversation from disk
+                    chatbot = await asyncio.to_thread(get_session, user_id)
+                    for index, message in turns:
+                        response = await chatbot.aget_response(message, user_id)
+                        results.put_nowait({"index": index, "user_id": user_id, "response": response})
+                        done += 1
+                except Exception as e:
+                    print(f"Batch error for {user_id}: {str(e)}")
+                    for index, _ in turns[done:]:
+                        results.put_nowait({"index": index, "user_id": user_id, "error": str(e)})
+
+        tasks = [asyncio.create_task(run_chain(user_id, turns)) for user_id, turns in chains.items()]
+        try:
+            for _ in range(sum(len(turns) for turns in chains.values())):
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # semantic response cache, only used when bot_config["response_cache"]["enabled"]
+    def _cached_response(self, user_input: str) -> Optional[str]:
+        cache = get_response_cache()
+        if cache is None:
+            return None
+        with telemetry.span("response_cache"):
+            response = cache.lookup(user_input)
+        telemetry.annotate(cache_hit=response is not None)
+        return response
+
+    def _store_response(self, user_input: str, bot_response: str, cost: float, context: dict, state: dict):
+        # only answers that came from the question alone: no stored facts in the prompt and
+        # no earlier turns (or summary of them) in the thread, anything else can't be shared
+        cache = get_response_cache()
+        if cache is None or context["user_context"] or state.get("summary") or len(state.get("messages", [])) > 2:
+            return
+        cache.store(user_input, bot_response, cost)
+
+    def _cached_turn(self, user_input: str, bot_response: str) -> dict:
+        # a cached answer still becomes part of the conversation, so follow-ups have it in context
+        return {"messages": [HumanMessage(content=user_input), AIMessage(content=bot_response)]}
+
+    def _chat_config(self, user_input: str = "", context: dict = None) -> dict:
+        config = self._thread_config()
+        config["configurable"]["system_prompt"] = (context or self._context_for(user_input))["system_prompt"]
+        config["configurable"]["model_tier"] = model_router.choose_tier(user_input)
+        return config
+
+    async def _arollback_turn(self, config: dict, human_message_id: str):
+        # drop a speculative turn: the human message and anything the graph added after it
+        state = await self.app.aget_state(config)
+        messages = state.values.get("messages", [])
+        ids = [m.id for m in messages]
+        if human_message_id not in ids:
+            return
+        stale = messages[ids.index(human_message_id):]
+        await self.app.aupdate_state(config, {"messages": [RemoveMessage(id=m.id) for m in stale]}, as_node="model")
         
 
 #check personal
@@ -1,14 +1,108 @@
 bot_config = {
+    "startup": {
+        "warm_up": True, # load langchain/groq, clients and the chat graph in the background once the server listens
+    },
     "model": {
+        # price is USD per million prompt / completion tokens, only used for the cost report
         "core_llm": {"name": "llama-3.3-70b-versatile",
                      "max_tokens": 1024,
-                     "temperature": 0.2}, # Randomness of the for versatile responses
-        "personal_info": {"name": "llama-3.3-70b-versatile",
+                     "temperature": 0.2, # Randomness of the for versatile responses
+                     "price": (0.59, 0.79)},
+        "small_llm": {"name": "llama-3.1-8b-instant", # small talk, simple lookups and tool routing
+                      "max_tokens": 512,
+                      "temperature": 0.2,
+                      "price": (0.05, 0.08)},
+        "personal_info": {"name": "llama-3.1-8b-instant",
                             "max_tokens": 512,
-                            "temperature": 0.0}, # Deterministic responses for stict cases 
+                            "temperature": 0.0, # Deterministic responses for stict cases
+                            "price": (0.05, 0.08)},
+    },
+    "model_routing": {
+        "enabled": True, # False sends every chat turn and tool routing call to core_llm
+        "small_max_words": 12, # longer turns, and any turn asking why/how/explain/write..., go to core_llm
+        "tool_router": "small_llm", # model asked when the local intent router is unsure
+        "escalate": True, # re-run on core_llm when the small model hedges, is cut off or is unsure
+        "escalate_confidence": 0.7, # small tool router answers below this are re-asked to core_llm
+        "stream_hold_chars": 200, # streamed small model replies are held back until a sentence ends or this many chars, to catch hedges
+    },
+    "http": {
+        "max_connections": 100, # pooled connections shared by all sessions
+        "max_keepalive_connections": 20,
+        "timeout": 60, # seconds
+    },
+    "router": {
+        "local_confidence": 0.8, # below this the LLM tool router is asked
+    },
+    "tools": {
+        "max_workers": 8, # threads per tool running its calls, several calls of one turn run in parallel
+        "timeout": 5, # seconds per tool call from when it starts running, unless the tool sets its own
+        "entry_points": True, # load tools from installed packages ("chatbot.tools" entry point group)
+    },
+    "background": {
+        "workers": 4, # threads running personal info extraction
+        "max_queue": 256, # pending jobs before submit() starts to wait
+        "put_timeout": 0.05, # seconds submit() waits for a free slot before dropping the job
+    },
+    "weather": {
+        "provider": "weatherapi", # "weatherapi" or "stub" (offline, fake readings)
+        "ttl": 600, # seconds a reading is served from cache
+        "stale_ttl": 3600, # max age of a reading served while the upstream is failing
+        "timeout": 1.5, # seconds to connect and to read, per upstream request
+        "retries": 1, # the weather tool's timeout covers all attempts, keep both small
+        "backoff": 0.3, # retry backoff factor, seconds
+        "pool_size": 20, # pooled upstream connections
+        "breaker_failures": 5, # consecutive errors before the circuit opens
+        "breaker_reset": 30, # seconds the circuit stays open
+    },
+    "extraction": {
+        "batch_size": 8, # turns sent to the personal info LLM in one call
+        "max_wait": 5.0, # seconds a turn waits for its batch to fill up
     },
     "conversation" : {
-        "max_history": 120,
+        "max_history": 120, # messages kept verbatim in a thread, older ones are folded into the summary
+        "max_context_tokens": 3000, # prompt budget: system prompt + summary + recent messages
+        "summary_every": 6, # turns of room a summary leaves in the prompt window, so it runs about this often
+        "context_cache_size": 10000, # users whose fact memory (see memory.py) is kept in memory
+    },
+    "memory": {
+        "top_k": 8, # facts about the user put in the prompt per turn
+        "pinned": ["name", "location"], # always included when known
+        "dedup_threshold": 0.9, # similarity above which two facts of a category are the same fact
+    },
+    "storage": {
+        "backend": "sqlite", # "sqlite" or "json" (old single file storage)
+        "path": "personal_info.db",
+        "json_path": "personal_info.json", # migrated into sqlite on first start
+        "batch_size": 32, # writes buffered before one commit
+        "flush_interval": 0.5, # seconds, max time a write waits in the buffer
+    },
+    "user_index": {
+        "refresh_interval": 5, # seconds between reads of names/users written by other workers
+    },
+    "session": {
+        "max_sessions": 1000, # live chatbot sessions kept in memory per worker
+        "ttl": 1800, # seconds of inactivity before a session is evicted
+        "memory_budget_mb": 512, # estimated memory of all live sessions
+        "spill_dir": "sessions", # evicted conversations are written here and restored on next use (memory checkpointer only)
+    },
+    "batch": {
+        "max_concurrency": 16, # users answered at once by /chat/batch, each user's messages run in order
+        "max_items": 5000, # messages per /chat/batch request
+    },
+    "response_cache": {
+        "enabled": False, # answer repeated context-free questions from a shared cache, skipping both LLM calls
+        "threshold": 0.9, # cosine similarity needed to reuse an answer to a differently worded question
+        "max_entries": 5000, # LRU bounded
+        "ttl": 86400, # seconds an answer is reused
+    },
+    "telemetry": {
+        "enabled": True, # per-stage timings, token counts and GET /metrics; False makes every span a no-op
+        "log_traces": False, # print one line per request with its trace id and stage timings
+    },
+    "checkpointer": {
+        "backend": "sqlite", # "sqlite" (durable, shared by all workers) or "memory" (per process)
+        "path": "checkpoints.db",
+        "keep_checkpoints": 2, # newest checkpoints kept per conversation, older ones are compacted away
     },
     "bot": {
         "name": "Priyanshu's Bot",
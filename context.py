@@ -0,0 +1,167 @@
+# token-budgeted conversation context: rolling summary + window of recent messages
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, List
+
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage, SystemMessage
+from langgraph.graph import MessagesState
+
+from config import bot_config
+import telemetry
+
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+MESSAGE_OVERHEAD_TOKENS = 4 # role/separator tokens added per message by the chat template
+
+SUMMARY_PROMPT = """
+You keep a running summary of a conversation between a user and an assistant.
+You get the current summary and the messages that happened after it.
+Return the updated summary: keep every specific detail about the user (names, places, preferences, facts) and
+the open topics, drop small talk. Return only the summary text.
+"""
+
+
+class ChatState(MessagesState):
+    # summary of everything that was trimmed out of `messages`
+    summary: str
+
+
+def count_tokens(text: str) -> int:
+    # local approximation of a BPE tokenizer, words and punctuation with ~1.3 tokens per word
+    return int(len(WORD_PATTERN.findall(text)) * 1.3)
+
+
+def message_tokens(message: BaseMessage) -> int:
+    return count_tokens(str(message.content)) + MESSAGE_OVERHEAD_TOKENS
+
+
+def select_window(messages: List[BaseMessage], budget: int) -> List[BaseMessage]:
+    """Most recent messages that fit in `budget` tokens, always at least the last one."""
+    window = []
+    used = 0
+    for message in reversed(messages):
+        cost = message_tokens(message)
+        if window and used + cost > budget:
+            break
+        window.append(message)
+        used += cost
+    window.reverse()
+    return window
+
+
+def summary_message(summary: str) -> SystemMessage:
+    return SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")
+
+
+def window_budget(system_prompt: str, summary: str = "") -> int:
+    """Tokens left for recent messages once the system prompt and the summary are in the prompt."""
+    budget = bot_config["conversation"]["max_context_tokens"] - message_tokens(SystemMessage(content=system_prompt))
+    if summary:
+        budget -= message_tokens(summary_message(summary))
+    return budget
+
+
+def build_prompt(state: ChatState, system_prompt: str) -> List[BaseMessage]:
+    prompt = [SystemMessage(content=system_prompt)]
+    summary = state.get("summary")
+    if summary:
+        prompt.append(summary_message(summary))
+    return prompt + select_window(state["messages"], window_budget(system_prompt, summary))
+
+
+def needs_summary(state: ChatState, system_prompt: str) -> bool:
+    # as soon as a message falls out of the prompt window it is in neither the prompt nor the summary
+    cfg = bot_config["conversation"]
+    messages = state["messages"]
+    if len(messages) > cfg["max_history"]:
+        return True
+    return len(select_window(messages, window_budget(system_prompt, state.get("summary")))) < len(messages)
+
+
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+def summarise_thread(app, llm, config: dict):
+    """
+    Fold the messages that no longer fit the prompt window (`config` carries the
+    thread_id and the system_prompt it is sized with) into the rolling summary and
+    remove them from the thread. Runs in the background, one job per thread at a time.
+    """
+    thread_id = config["configurable"]["thread_id"]
+    with _in_flight_lock:
+        if thread_id in _in_flight:
+            return
+        _in_flight.add(thread_id)
+
+    try:
+        cfg = bot_config["conversation"]
+        state = app.get_state(config).values
+        messages = state.get("messages", [])
+        # keep the prompt window minus its oldest `summary_every` turns, so the next turns fit
+        # without falling out of the prompt before the following summary, never more than max_history
+        window = select_window(messages, window_budget(config["configurable"]["system_prompt"], state.get("summary")))
+        keep = window[min(2 * cfg["summary_every"], len(window) - 1):][-cfg["max_history"]:]
+        old = messages[:len(messages) - len(keep)]
+        if not old:
+            return
+
+        transcript = "\n".join(
+            f"{'Human' if isinstance(m, HumanMessage) else 'AI'}: {m.content}" for m in old
+        )
+        with telemetry.span("summary"):
+            result = llm.invoke(
+                [
+                    SystemMessage(content=SUMMARY_PROMPT),
+                    HumanMessage(content=f"Current summary:\n{state.get('summary') or 'None'}\n\nNew messages:\n{transcript}"),
+                ],
+                config={"tags": ["summary"]},
+            )
+        telemetry.record_tokens("summary", result)
+        summary = result.content
+
+        app.update_state(
+            config,
+            {"summary": summary, "messages": [RemoveMessage(id=m.id) for m in old]},
+            as_node="model",
+        )
+    finally:
+        with _in_flight_lock:
+            _in_flight.discard(thread_id)
+
+
+class UserContextCache:
+    """
+    Per-user context built from storage (the user's fact memory), LRU bounded.
+
+    Entries are keyed by the storage version of the user, so a turn costs one
+    version lookup and the context is only rebuilt after new facts are saved.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0}
+
+    def get(self, user_id: str, storage, render: Callable) -> dict:
+        version = storage.get_version(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(user_id)
+                self.counters["hits"] += 1
+                return entry[1]
+            self.counters["misses"] += 1
+
+        # the stale entry is handed to render so it can reuse what is still valid
+        rendered = render(user_id, entry[1] if entry is not None else None)
+        with self._lock:
+            self._entries[user_id] = (version, rendered)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return rendered
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries)}
@@ -0,0 +1,128 @@
+# local text embeddings (feature hashing, no model download) and a small nearest-neighbour index
+import math
+import re
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, Hashable, List, Optional, Tuple
+
+DIMENSIONS = 1 << 18
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[^\sa-z0-9?!.,;:'\"]")
+CONTRACTIONS = {
+    "what's": "what is", "who's": "who is", "where's": "where is", "how's": "how is", "when's": "when is",
+    "it's": "it is", "that's": "that is", "there's": "there is", "isn't": "is not", "aren't": "are not",
+    "doesn't": "does not", "don't": "do not", "can't": "can not", "won't": "will not", "i'm": "i am",
+}
+# words that carry no meaning on their own, weighted down rather than dropped ("not" and numbers stay)
+STOP_WORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "to", "in", "on", "for", "and", "or",
+    "what", "who", "how", "which", "do", "does", "did", "can", "could", "would", "please", "tell", "me",
+    "you", "about", "some", "give", "explain", "describe",
+}
+
+Vector = Dict[int, float]
+
+
+def normalise(text: str) -> str:
+    """Lowercase, expand contractions, drop punctuation that doesn't change the meaning, collapse spaces."""
+    text = text.lower().replace("’", "'")
+    text = re.sub(r"\b(" + "|".join(re.escape(c) for c in CONTRACTIONS) + r")\b", lambda m: CONTRACTIONS[m.group(1)], text)
+    return " ".join(TOKEN_PATTERN.findall(text))
+
+
+def _feature(kind: str, value: str) -> int:
+    # crc32 instead of hash(): stable across processes and restarts
+    return zlib.crc32(f"{kind}:{value}".encode()) % DIMENSIONS
+
+
+def embed(text: str) -> Vector:
+    """
+    Sparse unit vector of hashed word, word-pair and character trigram features.
+    Close paraphrases ("capital of france?" / "What's the capital of France")
+    score near 1.0, questions about a different subject stay well below.
+    """
+    words = normalise(text).split()
+    features: Counter = Counter()
+    for word in words:
+        weight = 0.2 if word in STOP_WORDS else 1.0
+        features[_feature("w", word)] += weight
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            features[_feature("c", padded[i:i + 3])] += 0.25 * weight
+    content = [w for w in words if w not in STOP_WORDS]
+    for first, second in zip(content, content[1:]):
+        features[_feature("b", f"{first} {second}")] += 0.5
+
+    norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+    return {key: value / norm for key, value in features.items()}
+
+
+def cosine(a: Vector, b: Vector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(key, 0.0) for key, value in a.items())
+
+
+class VectorIndex:
+    """
+    Cosine nearest-neighbour search over sparse vectors.
+
+    Small indexes (up to `exhaustive_size` entries) score every entry sharing a
+    feature with the query. Bigger ones use the inverted index (feature -> keys)
+    to pick candidates: only the postings of the `probes` rarest query features
+    are read, and the candidates are then scored exactly. Close neighbours share
+    most features, rare ones included, so they are found while a lookup stays
+    cheap however many entries share common features ("the", " th").
+    """
+
+    def __init__(self, probes: int = 4, exhaustive_size: int = 256):
+        self.probes = probes
+        self.exhaustive_size = exhaustive_size
+        self._vectors: Dict[Hashable, Vector] = {}
+        self._postings: Dict[int, set] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._vectors
+
+    def add(self, key: Hashable, vector: Vector):
+        with self._lock:
+            if key in self._vectors:
+                self._remove(key)
+            self._vectors[key] = vector
+            for feature in vector:
+                self._postings.setdefault(feature, set()).add(key)
+
+    def remove(self, key: Hashable):
+        with self._lock:
+            if key in self._vectors:
+                self._remove(key)
+
+    def _remove(self, key: Hashable):
+        for feature in self._vectors.pop(key):
+            keys = self._postings.get(feature)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[feature]
+
+    def search(self, query: Vector, k: int = 1, min_score: float = 0.0) -> List[Tuple[Hashable, float]]:
+        with self._lock:
+            if len(self._vectors) <= self.exhaustive_size:
+                scores: Dict[Hashable, float] = {}
+                for feature, weight in query.items():
+                    for key in self._postings.get(feature, ()):
+                        scores[key] = scores.get(key, 0.0) + weight * self._vectors[key][feature]
+            else:
+                postings = sorted((self._postings[f] for f in query if f in self._postings), key=len)
+                candidates = set().union(*postings[:self.probes])
+                scores = {key: cosine(query, self._vectors[key]) for key in candidates}
+        ranked = sorted(((key, score) for key, score in scores.items() if score >= min_score), key=lambda item: -item[1])
+        return ranked[:k]
+
+    def nearest(self, query: Vector) -> Optional[Tuple[Hashable, float]]:
+        results = self.search(query, k=1)
+        return results[0] if results else None
@@ -0,0 +1,191 @@
+# batched personal info extraction: cheap local pre-filter, then one LLM call for many turns/users
+import json
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from config import bot_config
+import telemetry
+import model_router
+from background import get_queue
+from memory import is_duplicate
+
+# a turn can only carry personal info if the user talks about themselves
+FIRST_PERSON = re.compile(r"\b(i|i'm|im|i've|i'd|i'll|my|me|mine|myself|we|we're|our|us)\b", re.IGNORECASE)
+SMALL_TALK = re.compile(
+    r"^\s*(ok(ay)?|thanks?( you)?|thank you|cool|great|nice|yes|no|yeah|nope|sure|hi|hello|hey|bye|lol|i see|got it|me too)[\s.!?]*$",
+    re.IGNORECASE,
+)
+
+BATCH_PROMPT = """
+Your job is to analyze short conversations and extract any details about the human's personal life,
+categorized as follows:
+{categories}
+
+Every conversation is tagged with a turn id. Return JSON only, in this format:
+{{"facts": [{{"turn": <turn id>, "category": "<category>", "detail": "<detail>"}}]}}
+
+Only use the categories listed above. Return {{"facts": []}} if no personal information is found.
+Do not provide any additional commentary or explanation.
+"""
+
+
+def parse_json_object(text: str) -> dict:
+    # models sometimes wrap the json in prose or ```json fences
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        match = re.search(r"\{.*\}", text, re.DOTALL)
+        if not match:
+            raise
+        return json.loads(match.group(0))
+
+
+# users whose last reply from the bot was a question, their next turn is likely an answer about themselves
+MAX_OPEN_QUESTIONS = 10000
+
+
+def has_personal_content(human_message: str, asked: str = None) -> bool:
+    """
+    Local pre-filter, False for turns that can't contain personal info ("ok thanks", general questions).
+    `asked` is the bot's previous reply if it was a question, the answer ("Italian mostly") then counts too.
+    """
+    if SMALL_TALK.match(human_message):
+        return False
+    return bool(asked) or bool(FIRST_PERSON.search(human_message))
+
+
+class ExtractionScheduler:
+    """
+    Collects chat turns that pass the pre-filter and extracts personal info from
+    several turns (of any users) in one LLM call. A batch is sent when it reaches
+    `batch_size` turns or its oldest turn has waited `max_wait` seconds; the facts
+    found are written to storage in one bulk write.
+    """
+
+    def __init__(self, llm_getter: Callable, storage_getter: Callable, categories: List[str],
+                 batch_size: int = None, max_wait: float = None):
+        cfg = bot_config["extraction"]
+        self.llm_getter = llm_getter
+        self.storage_getter = storage_getter
+        self.categories = categories
+        self.batch_size = batch_size or cfg["batch_size"]
+        self.max_wait = max_wait if max_wait is not None else cfg["max_wait"]
+
+        self.prompt = BATCH_PROMPT.format(categories="\n".join(categories))
+        self._pending = [] # (user_id, human_message, response, question the human answered or None)
+        self._questions: Dict[str, str] = {} # user_id -> bot's last reply, when it asked something
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self.counters = {"turns": 0, "skipped": 0, "batches": 0, "facts": 0, "duplicates": 0, "errors": 0}
+
+        if self.max_wait > 0:
+            threading.Thread(target=self._timer, name="extraction-timer", daemon=True).start()
+
+    def add(self, user_id: str, human_message: str, response: str):
+        with self._lock:
+            self.counters["turns"] += 1
+            asked = self._questions.pop(user_id, None)
+            if response.rstrip().endswith("?"):
+                if len(self._questions) >= MAX_OPEN_QUESTIONS:
+                    self._questions.pop(next(iter(self._questions)))
+                self._questions[user_id] = response
+            if not has_personal_content(human_message, asked):
+                self.counters["skipped"] += 1
+                return
+            self._pending.append((user_id, human_message, response, asked))
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._schedule_flush()
+
+    def flush(self):
+        """Extract and save everything pending, on the calling thread."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._oldest = None
+        if batch:
+            self._extract(batch)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "pending": len(self._pending)}
+
+    def _schedule_flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._oldest = None
+        if batch:
+            get_queue("extraction").submit(self._extract, batch)
+
+    def _timer(self):
+        while True:
+            time.sleep(self.max_wait / 2)
+            with self._lock:
+                due = self._oldest is not None and time.monotonic() - self._oldest >= self.max_wait
+            if due:
+                self._schedule_flush()
+
+    def _extract(self, batch: list):
+        turns = "\n\n".join(
+            f"[turn {i}]\n" + (f"AI: {asked}\n" if asked else "") + f"Human: {human_message}\nAI: {response}"
+            for i, (_, human_message, response, asked) in enumerate(batch)
+        )
+        with self._lock:
+            self.counters["batches"] += 1
+        try:
+            start = time.perf_counter()
+            with telemetry.span("extraction"):
+                result = self.llm_getter().invoke(
+                    [SystemMessage(content=self.prompt), HumanMessage(content=turns)]
+                )
+            model_router.usage.record("personal_info", time.perf_counter() - start, result)
+            telemetry.record_tokens("extraction", result)
+            facts = parse_json_object(result.content).get("facts", [])
+        except Exception as e:
+            with self._lock:
+                self.counters["errors"] += 1
+            print(f"Extraction error: {str(e)}")
+            return
+
+        entries = []
+        for fact in facts:
+            try:
+                turn = int(fact["turn"])
+                category = str(fact["category"]).strip().lower()
+                detail = str(fact["detail"]).strip()
+            except (KeyError, ValueError, TypeError):
+                continue
+            # the batch mixes users, a turn id outside it (batch[-1] is valid python) would file the fact under someone else
+            if not 0 <= turn < len(batch):
+                continue
+            user_id = batch[turn][0]
+            if category in self.categories and detail:
+                entries.append((user_id, category, detail))
+
+        entries = self._new_facts(entries)
+        print(f"Detected Info: {len(entries)} facts from {len(batch)} turns")
+        if entries:
+            self.storage_getter().save_many(entries)
+            with self._lock:
+                self.counters["facts"] += len(entries)
+
+    def _new_facts(self, entries: list) -> list:
+        # near-identical facts ("Pune" / "pune." / "Pune city") are stored once
+        storage = self.storage_getter()
+        threshold = bot_config["memory"]["dedup_threshold"]
+        known = {user_id: storage.load_personal_info(user_id, "all") or {} for user_id in {e[0] for e in entries}}
+        new = []
+        for user_id, category, detail in entries:
+            existing = known[user_id].setdefault(category, [])
+            if is_duplicate(detail, existing, threshold):
+                with self._lock:
+                    self.counters["duplicates"] += 1
+                continue
+            existing.append(detail)
+            new.append((user_id, category, detail))
+        return new
@@ -0,0 +1,14 @@
+# gunicorn reads this from the working directory (see Procfile), bind/workers come from the command line
+
+def when_ready(server):
+    # master with the socket bound, before any worker is forked: with --preload the heavy
+    # imports go here once and the workers share them copy-on-write
+    if server.cfg.preload_app:
+        import startup
+        startup.preload()
+
+
+def post_worker_init(worker):
+    # clients, storage, user index and the graph are per process, build them in the background
+    import startup
+    startup.start_warm_up()
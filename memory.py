@@ -0,0 +1,119 @@
+# per-user fact memory: facts are embedded locally and only the ones relevant to the current message go in the prompt
+from typing import Dict, List, Optional, Tuple
+
+from config import bot_config
+from embedding import VectorIndex, cosine, embed, normalise
+
+Fact = Tuple[str, str] # (info_type, info)
+
+
+def fact_vector(info_type: str, info: str):
+    return embed(f"{info_type.replace('_', ' ')} {info}")
+
+
+def is_duplicate(info: str, existing: List[str], threshold: float) -> bool:
+    """True if `info` says the same as one of `existing` (same category), e.g. "Pune" / "pune." / "Pune city"."""
+    key = normalise(info)
+    vector = embed(info)
+    return any(normalise(other) == key or cosine(vector, embed(other)) >= threshold for other in existing)
+
+
+def dedup_facts(facts: List[Fact], threshold: float = None, known: set = frozenset()) -> List[Fact]:
+    """
+    Drop near-identical facts within a category, the first wording is kept.
+    Facts in `known` were deduplicated before and are kept without a check.
+    """
+    threshold = threshold if threshold is not None else bot_config["memory"]["dedup_threshold"]
+    by_type: Dict[str, List[str]] = {}
+    indexes: Dict[str, VectorIndex] = {}
+    kept = []
+    for info_type, info in facts:
+        existing = by_type.setdefault(info_type, [])
+        index = indexes.get(info_type)
+        if (info_type, info) not in known:
+            if index is None:
+                # a category's index is only built once it has a fact to check
+                index = indexes[info_type] = VectorIndex()
+                for other in existing:
+                    index.add(normalise(other), embed(other))
+            key = normalise(info)
+            vector = embed(info)
+            match = index.nearest(vector)
+            if key in index or (match is not None and match[1] >= threshold):
+                continue
+            index.add(key, vector)
+        elif index is not None:
+            index.add(normalise(info), embed(info))
+        existing.append(info)
+        kept.append((info_type, info))
+    return kept
+
+
+class UserMemory:
+    """
+    All facts of one user in a vector index. retrieve() returns the pinned
+    categories (name, location), then the facts closest to the message, then the
+    newest ones, at most `top_k` in total, so the prompt stays the same size however
+    much is known about the user.
+
+    Pass the user's `previous` memory when rebuilding after new facts were saved:
+    its index is taken over and only the new facts are checked and embedded.
+    """
+
+    def __init__(self, user_data: Dict[str, List[str]], previous: Optional["UserMemory"] = None,
+                 top_k: int = None, pinned: List[str] = None, dedup_threshold: float = None):
+        cfg = bot_config["memory"]
+        self.top_k = top_k or cfg["top_k"]
+        self.pinned = pinned if pinned is not None else cfg["pinned"]
+
+        facts = [(info_type, str(info)) for info_type, values in (user_data or {}).items()
+                 for info in (values if isinstance(values, list) else [values])]
+        known = set(previous.facts) if previous is not None else frozenset()
+        self.facts = dedup_facts(facts, dedup_threshold, known=known)
+        self.position = {fact: i for i, fact in enumerate(self.facts)}
+
+        self.index = previous.index if previous is not None else VectorIndex()
+        for fact in known - self.position.keys():
+            self.index.remove(fact)
+        if len(self.facts) > self.top_k:
+            for fact in self.facts:
+                if fact not in self.index:
+                    self.index.add(fact, fact_vector(*fact))
+
+    def __len__(self) -> int:
+        return len(self.facts)
+
+    def retrieve(self, message: str = "") -> Dict[str, List[str]]:
+        if len(self.facts) <= self.top_k:
+            return self._group(range(len(self.facts)))
+
+        chosen = []
+        # pinned categories first, newest value of each
+        for category in self.pinned:
+            for i in range(len(self.facts) - 1, -1, -1):
+                if self.facts[i][0] == category:
+                    chosen.append(i)
+                    break
+
+        if message:
+            for fact, _ in self.index.search(embed(message), k=self.top_k, min_score=0.1):
+                i = self.position.get(fact)
+                if len(chosen) >= self.top_k:
+                    break
+                if i is not None and i not in chosen:
+                    chosen.append(i)
+
+        for i in range(len(self.facts) - 1, -1, -1):
+            if len(chosen) >= self.top_k:
+                break
+            if i not in chosen:
+                chosen.append(i)
+
+        return self._group(sorted(chosen[:self.top_k]))
+
+    def _group(self, positions) -> Dict[str, List[str]]:
+        data: Dict[str, List[str]] = {}
+        for i in positions:
+            info_type, info = self.facts[i]
+            data.setdefault(info_type, []).append(info)
+        return data
@@ -0,0 +1,97 @@
+# picks the model tier for each call: the small fast model for cheap turns, core_llm (70B) when needed
+import re
+import threading
+from typing import Dict, Optional
+
+from config import bot_config
+import telemetry
+
+# turns that need the large model whatever their length
+COMPLEX = re.compile(
+    r"\b(why|how|explain|compare|difference|analy[sz]e|reason|prove|calculate|solve|code|program|debug|"
+    r"write|story|essay|poem|plan|summari[sz]e|translate|recommend|suggest|advice|pros|cons|step)\b",
+    re.IGNORECASE,
+)
+# small model replies that suggest it was out of its depth
+HEDGES = re.compile(
+    r"\b(i'?m not sure|i am not sure|i don'?t know|i do not know|i'?m unable|i cannot answer|i can'?t answer|"
+    r"not enough information|unclear what you mean)\b",
+    re.IGNORECASE,
+)
+
+
+def choose_tier(text: str) -> str:
+    """ "small_llm" for short small-talk and simple lookups, "core_llm" otherwise."""
+    cfg = bot_config["model_routing"]
+    if not cfg["enabled"]:
+        return "core_llm"
+    if len(text.split()) > cfg["small_max_words"] or "```" in text or COMPLEX.search(text):
+        return "core_llm"
+    return "small_llm"
+
+
+def tool_router_tier() -> str:
+    cfg = bot_config["model_routing"]
+    return cfg["tool_router"] if cfg["enabled"] else "core_llm"
+
+
+def needs_escalation(tier: str, message) -> bool:
+    """True when a small model reply should be regenerated by core_llm: empty, "unknown", hedging or cut off at max_tokens."""
+    if tier == "core_llm" or not bot_config["model_routing"]["escalate"]:
+        return False
+    content = str(message.content).strip()
+    finish_reason = (getattr(message, "response_metadata", None) or {}).get("finish_reason")
+    # the system prompt asks for a bare "unknown" when the model doesn't know
+    unknown = content.strip(" .!\"'").lower() == "unknown"
+    return not content or unknown or finish_reason == "length" or bool(HEDGES.search(content))
+
+
+def needs_router_escalation(tier: str, result: Optional[dict]) -> bool:
+    """True when a small model tool routing answer was unparseable or not confident enough."""
+    if tier == "core_llm" or not bot_config["model_routing"]["escalate"]:
+        return False
+    return result is None or result.get("confidence", 0) < bot_config["model_routing"]["escalate_confidence"]
+
+
+class TierUsage:
+    """Calls, latency, tokens and cost per model tier, priced from bot_config["model"][tier]["price"]."""
+
+    def __init__(self):
+        self._tiers: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, tier: str, seconds: float, message, escalated: bool = False):
+        usage = getattr(message, "usage_metadata", None) or {}
+        with self._lock:
+            entry = self._tiers.setdefault(
+                tier, {"calls": 0, "escalations": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0},
+            )
+            entry["calls"] += 1
+            entry["escalations"] += escalated
+            entry["seconds"] += seconds
+            entry["prompt_tokens"] += usage.get("input_tokens", 0)
+            entry["completion_tokens"] += usage.get("output_tokens", 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            tiers = {tier: dict(entry) for tier, entry in self._tiers.items()}
+        for tier, entry in tiers.items():
+            prompt_price, completion_price = bot_config["model"].get(tier, {}).get("price", (0, 0))
+            entry["model"] = bot_config["model"].get(tier, {}).get("name", tier)
+            entry["avg_ms"] = round(entry["seconds"] / entry["calls"] * 1000, 1) if entry["calls"] else 0.0
+            entry["seconds"] = round(entry["seconds"], 3)
+            entry["cost_usd"] = round(
+                (entry["prompt_tokens"] * prompt_price + entry["completion_tokens"] * completion_price) / 1e6, 6,
+            )
+        return tiers
+
+
+usage = TierUsage()
+
+
+def _tier_metrics(key: str):
+    return {(("tier", tier),): entry[key] for tier, entry in usage.stats().items()}
+
+telemetry.register_gauge("chatbot_model_calls", "Model calls per tier so far", lambda: _tier_metrics("calls"))
+telemetry.register_gauge("chatbot_model_escalations", "Calls re-run on core_llm after a weak small model answer", lambda: _tier_metrics("escalations"))
+telemetry.register_gauge("chatbot_model_cost_usd", "Estimated model cost per tier so far", lambda: _tier_metrics("cost_usd"))
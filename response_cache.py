@@ -0,0 +1,144 @@
+# opt-in semantic cache for answers to context-free questions ("What's the capital of France?")
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import bot_config
+import telemetry
+from embedding import STOP_WORDS, VectorIndex, embed, normalise
+from router import TOOL_KEYWORDS
+
+# answers to these depend on who is asking or on the conversation so far, never cached
+PERSONAL = re.compile(
+    r"\b(i|i'm|im|i've|i'd|i'll|my|me|mine|myself|we|we're|our|us|you|your|yours)\b", re.IGNORECASE,
+)
+FOLLOW_UP = re.compile(
+    r"\b(it|its|that|this|these|those|they|them|their|he|him|his|she|her|there|again|more|another|else|"
+    r"above|previous|earlier|before|last|same|also|too|instead|continue|why not|and then)\b",
+    re.IGNORECASE,
+)
+# elliptical follow-ups ("What about Germany?", "And Spain?") only make sense with the previous turn
+ELLIPTICAL = re.compile(r"^\W*(and|or|but|so|then|what about|how about|what of)\b", re.IGNORECASE)
+TOOL_WORDS = re.compile("|".join(TOOL_KEYWORDS.values()), re.IGNORECASE)
+# answers that go stale long before the ttl ("What is today's date?", "latest news")
+TIME_SENSITIVE = re.compile(
+    r"\b(today|tonight|now|date|latest|current|currently|recent|recently|tomorrow|yesterday|news)\b", re.IGNORECASE,
+)
+
+
+def is_cacheable(text: str) -> bool:
+    """False for turns whose answer depends on personal context, history, the date, or live tool data."""
+    if len(text) > 300 or len(text.split()) < 3:
+        return False
+    return not (PERSONAL.search(text) or FOLLOW_UP.search(text) or ELLIPTICAL.search(text)
+                or TOOL_WORDS.search(text) or TIME_SENSITIVE.search(text))
+
+
+def same_order(text: str, key: str) -> bool:
+    """
+    A near match is only the same question if it has the same numbers and the content words both share
+    come in the same order: "100 fahrenheit to celsius" is not "100 celsius to fahrenheit".
+    """
+    words = [w for w in normalise(text).split() if w not in STOP_WORDS]
+    other = [w for w in key.split() if w not in STOP_WORDS]
+    if {w for w in words if w.isdigit()} != {w for w in other if w.isdigit()}:
+        return False
+    shared = set(words) & set(other)
+    return list(dict.fromkeys(w for w in words if w in shared)) == list(dict.fromkeys(w for w in other if w in shared))
+
+
+class SemanticResponseCache:
+    """
+    Answers keyed on the normalised question, looked up by exact match first and
+    then by nearest neighbour over local embeddings (cosine >= `threshold`, same
+    numbers and word order, see same_order).
+    LRU bounded by `max_entries`, entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, threshold: float = 0.9, max_entries: int = 5000, ttl: float = 86400):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[str, dict]" = OrderedDict() # normalised question -> entry
+        self._index = VectorIndex()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "exact_hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "evictions": 0}
+        self.saved_seconds = 0.0
+
+    def lookup(self, text: str) -> Optional[str]:
+        if not is_cacheable(text):
+            with self._lock:
+                self.counters["bypassed"] += 1
+            return None
+
+        key = normalise(text)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            exact = entry is not None
+        if entry is None:
+            match = self._index.nearest(embed(text))
+            if match is not None and match[1] >= self.threshold and same_order(text, match[0]):
+                with self._lock:
+                    entry = self._entries.get(match[0])
+
+        with self._lock:
+            if entry is None or now - entry["stored_at"] > self.ttl:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(entry["key"])
+            self.counters["hits"] += 1
+            self.counters["exact_hits"] += exact
+            self.saved_seconds += entry["cost"]
+            return entry["response"]
+
+    def store(self, text: str, response: str, cost: float = 0.0):
+        """Remember `response`, `cost` is the seconds it took to produce (reported as saved on hits)."""
+        if not is_cacheable(text):
+            return
+        key = normalise(text)
+        self._index.add(key, embed(text))
+        with self._lock:
+            self._entries[key] = {"key": key, "response": response, "cost": cost, "stored_at": time.monotonic()}
+            self._entries.move_to_end(key)
+            self.counters["stores"] += 1
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+                self.counters["evictions"] += 1
+        for old_key in evicted:
+            self._index.remove(old_key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "entries": len(self._entries),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[SemanticResponseCache]:
+    """Process wide cache, None unless bot_config["response_cache"]["enabled"]."""
+    global _cache
+    cfg = bot_config["response_cache"]
+    if not cfg["enabled"]:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticResponseCache(cfg["threshold"], cfg["max_entries"], cfg["ttl"])
+        return _cache
+
+
+telemetry.register_gauge(
+    "chatbot_cache_lookups", "Cache lookups by cache and result",
+    telemetry.stats_collector(lambda: _cache and _cache.stats(), ["hits", "misses", "bypassed"], cache="response"),
+)
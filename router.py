@@ -0,0 +1,225 @@
+# local intent classifier, decides the obvious tool/no-tool turns without an LLM call
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# phrasings that clearly ask for a tool
+STRONG_PATTERNS = {
+    "weather": [
+        r"\b(what'?s|what is|how'?s|how is|tell me|check|give me|show me|get me)\s+(?:the\s+|today'?s\s+|current\s+|local\s+|latest\s+)*(weather|temperature|forecast)\b",
+        r"\b(weather|temperature|forecast)\s+(in|at|for|like|today|now|outside|right now)\b",
+        r"\bis it (raining|snowing|sunny|hot|cold|cloudy|windy)\b",
+        r"\bhow (hot|cold|warm) is it\b",
+        r"\bneed an? (umbrella|jacket|coat)\b",
+        r"^\s*(weather|temperature|forecast)\b",
+    ],
+    "time": [
+        r"\bwhat(?:'s| is)? the (?:current |exact )?time\b(?!\s+(?:complexity|zone|difference))",
+        r"\bwhat time (?:is it|it is)\b",
+        r"\b(current|exact) time\b",
+        r"\btime (?:is it )?(?:right )?now\b",
+        r"\btell me the time\b",
+        r"^\s*(?:the\s+)?(?:current\s+)?time\s*\??\s*$",
+    ],
+}
+
+# a turn without any of these words never needs a tool
+TOOL_KEYWORDS = {
+    "weather": r"\b(weather|temperature|forecast|rain\w*|snow\w*|sunny|humid\w*|cloudy|windy|degrees|umbrella|hot|cold|warm)\b",
+    "time": r"\b(time|clock|o'?clock)\b",
+}
+
+# turns that mention tool words but are ordinary chat, used as the "none" class by the nearest-neighbour index
+NONE_EXAMPLES = [
+    "I love rainy weather",
+    "I had a great time yesterday",
+    "Last time we talked about movies",
+    "Tell me a joke",
+    "What's the capital of France?",
+    "How are you today?",
+    "What is my name?",
+    "Can you explain how weather forecasting works?",
+    "Write a poem about the snow",
+    "I don't have time for this",
+    "How do I manage my time better?",
+    "What is time complexity of quicksort?",
+    "Why is the sky blue?",
+    "What time zone is India in?",
+]
+
+CITY_PATTERN = re.compile(
+    r"\b(?:in|at|for)\s+([A-Za-z][A-Za-z .'-]*?)\s*(?:[?!.,]|$|\b(?:today|tomorrow|now|right now|currently|please|outside|and|or|but)\b)",
+    re.IGNORECASE,
+)
+NOT_A_CITY = {"the morning", "the evening", "the afternoon", "the night", "general", "my city", "my area", "here"}
+# a captured place is taken only if it looks like a name: capitalised words ("Rio de Janeiro"), not "which water boils"
+PLACE_CONNECTORS = {"de", "del", "da", "do", "dos", "la", "le", "les", "of", "on", "upon", "am", "der", "sur", "al", "el"}
+NOT_A_PLACE_START = {"my", "your", "our", "his", "her", "their", "which", "what", "where", "when", "who", "whom", "whose",
+                     "that", "this", "these", "those", "a", "an", "the", "next", "last"}
+MAX_PLACE_WORDS = 4
+
+# weather turns that need no city, the user's saved location is used. Any other weather turn without a
+# city ("the temperature of the sun") is left to the LLM router.
+LOCAL_WEATHER = re.compile(
+    r"^\s*(?:(?:can|could) you\s+|please\s+)?"
+    r"(?:(?:what'?s|what is|how'?s|how is|tell me|check|give me|show me|get me)\s+(?:the\s+|today'?s\s+|current\s+)*"
+    r"(?:weather|temperature|forecast)(?:\s+like)?"
+    r"|is it (?:raining|snowing|sunny|hot|cold|cloudy|windy)"
+    r"|how (?:hot|cold|warm) is it"
+    r"|(?:do|will) i need an? (?:umbrella|jacket|coat)"
+    r"|(?:the\s+)?(?:weather|temperature|forecast))"
+    r"(?:\s+(?:today|now|right now|outside|here|tonight))*\s*[?!.]*\s*$",
+    re.IGNORECASE,
+)
+DOUBTFUL_CONFIDENCE = 0.5
+
+TOKEN_PATTERN = re.compile(r"[a-z']+")
+
+# "weather in London and Tokyo, and the time" -> one clause per tool call
+CLAUSE_SPLIT = re.compile(r"\s*(?:,|;|&|\band\b|\balso\b|\bplus\b)\s*", re.IGNORECASE)
+# a clause that is only a place name continues the previous weather call ("... and Tokyo")
+PLACE_ONLY = re.compile(r"^(?:in\s+|for\s+|at\s+)?([A-Z][\w.'-]*(?:\s+[A-Z][\w.'-]*){0,2})\s*[?!.]*$")
+
+
+def _tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class IntentRouter:
+    """
+    Keyword/regex rules plus a TF-IDF nearest-neighbour index over the tool examples.
+
+    classify() returns the same shape as the LLM router
+    ({"tool", "params", "confidence", "context_used"}); callers only go to the LLM
+    when confidence is below their threshold.
+    """
+
+    def __init__(self, tools_registry: dict, none_examples: List[str] = None):
+        self.tools_registry = tools_registry
+        # built-in rules above, plugin tools bring their own patterns and keywords
+        self.strong = {
+            name: [re.compile(p, re.IGNORECASE) for p in STRONG_PATTERNS.get(name, []) + list(getattr(tool, "patterns", []))]
+            for name, tool in tools_registry.items()
+        }
+        keywords = {name: TOOL_KEYWORDS.get(name) or getattr(tool, "keywords", None) for name, tool in tools_registry.items()}
+        self.keywords = {name: re.compile(pattern, re.IGNORECASE) for name, pattern in keywords.items() if pattern}
+
+        labelled: List[Tuple[str, str]] = []
+        for name, tool in tools_registry.items():
+            labelled.extend((name, example) for example in tool.examples)
+        labelled.extend(("none", example) for example in (none_examples or NONE_EXAMPLES))
+        self._build_index(labelled)
+
+    def _build_index(self, labelled: List[Tuple[str, str]]):
+        docs = [Counter(_tokenize(text)) for _, text in labelled]
+        doc_freq = Counter(token for doc in docs for token in doc)
+        n_docs = len(docs)
+        self.idf = {token: math.log((1 + n_docs) / (1 + df)) + 1 for token, df in doc_freq.items()}
+        self.index = [(label, self._vector(doc)) for (label, _), doc in zip(labelled, docs)]
+
+    def _vector(self, counts: Counter) -> Dict[str, float]:
+        vec = {token: count * self.idf.get(token, 0.0) for token, count in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {token: v / norm for token, v in vec.items()}
+
+    def nearest(self, text: str) -> Tuple[str, float]:
+        query = self._vector(Counter(_tokenize(text)))
+        best_label, best_score = "none", 0.0
+        for label, vec in self.index:
+            score = sum(weight * vec.get(token, 0.0) for token, weight in query.items())
+            if score > best_score:
+                best_label, best_score = label, score
+        return best_label, best_score
+
+    def classify(self, text: str) -> dict:
+        for name, patterns in self.strong.items():
+            if any(p.search(text) for p in patterns):
+                return self._result(name, text, 0.95)
+
+        mentioned = [name for name, pattern in self.keywords.items() if pattern.search(text)]
+        # a tool without keywords can be asked for in any words, so no turn is ruled out for it
+        ungated = [name for name in self.strong if name not in self.keywords]
+        if not mentioned and not ungated:
+            return self._result("none", text, 0.95)
+
+        # mentions a tool word but not in an obvious way, let the index decide
+        label, score = self.nearest(text)
+        if label != "none" and label not in mentioned and label not in ungated:
+            score *= 0.5
+        return self._result(label, text, round(score, 3))
+
+    def classify_many(self, text: str, min_confidence: float = 0.0) -> dict:
+        """
+        classify() for turns asking for several tools. The result also has "calls",
+        [{"tool", "params"}, ...] in the order asked, "tool"/"params" are the first call.
+        Clauses classified below `min_confidence` are left out. If such a clause mentions a
+        tool word ("... and the time in Tokyo"), the turn's confidence drops below
+        `min_confidence` too, so the LLM router handles the whole turn instead of part of it.
+        """
+        result = self.classify(text)
+        clauses = [clause for clause in CLAUSE_SPLIT.split(text) if clause.strip()]
+        if result["tool"] == "none" or len(clauses) < 2:
+            result["calls"] = [{"tool": result["tool"], "params": result["params"]}] if result["tool"] != "none" else []
+            return result
+
+        calls = []
+        confidences = [] # of the clauses, the whole turn is only as sure as its least sure clause
+        for clause in clauses:
+            part = self.classify(clause)
+            place = PLACE_ONLY.match(clause.strip())
+            if part["tool"] == "none" and place and calls and calls[-1]["tool"] == "weather":
+                part = {"tool": "weather", "params": {"city": place.group(1)}, "confidence": part["confidence"]}
+            if part["tool"] == "none" or part["confidence"] < min_confidence:
+                if any(pattern.search(clause) for pattern in self.keywords.values()):
+                    confidences.append(min(part["confidence"], DOUBTFUL_CONFIDENCE))
+                continue
+            confidences.append(part["confidence"])
+            call = {"tool": part["tool"], "params": part["params"]}
+            if call not in calls:
+                calls.append(call)
+
+        if not calls:
+            calls = [{"tool": result["tool"], "params": result["params"]}]
+            confidences.append(result["confidence"])
+        return {**result, "tool": calls[0]["tool"], "params": calls[0]["params"], "calls": calls, "confidence": min(confidences)}
+
+    def _result(self, tool: str, text: str, confidence: float) -> dict:
+        params = self.extract_params(tool, text) if tool != "none" else {}
+        if tool != "none" and not self._extracts_params(tool):
+            # only the LLM router can fill in this tool's parameters
+            confidence = min(confidence, DOUBTFUL_CONFIDENCE)
+        elif tool == "weather" and "city" not in params and not LOCAL_WEATHER.match(text):
+            # no (believable) city and not a plain "what's the weather", the LLM decides
+            confidence = min(confidence, DOUBTFUL_CONFIDENCE)
+        return {"tool": tool, "params": params, "confidence": confidence, "context_used": False}
+
+    def _extracts_params(self, tool: str) -> bool:
+        definition = self.tools_registry[tool]
+        required = [p for p in getattr(definition, "parameters", []) if p.required]
+        return not required or tool == "weather" or getattr(definition, "extract_params", None) is not None
+
+    def extract_params(self, tool: str, text: str) -> dict:
+        params = {}
+        extract = getattr(self.tools_registry[tool], "extract_params", None)
+        if extract is not None:
+            params.update(extract(text) or {})
+        elif tool == "weather":
+            city = self.extract_city(text)
+            if city:
+                params["city"] = city
+        return params
+
+    def extract_city(self, text: str) -> Optional[str]:
+        for match in CITY_PATTERN.finditer(text):
+            city = match.group(1).strip(" .'-")
+            if city and city.lower() not in NOT_A_CITY and self._looks_like_place(city):
+                return city
+        return None
+
+    def _looks_like_place(self, city: str) -> bool:
+        words = city.split()
+        if len(words) > MAX_PLACE_WORDS or words[0].lower() in NOT_A_PLACE_START:
+            return False
+        names = [word for word in words if word.lower() not in PLACE_CONNECTORS]
+        return bool(names) and all(word[0].isupper() for word in names) and words[-1][0].isupper()
@@ -0,0 +1,132 @@
+# bounded per-user session cache for the web app
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict
+
+from config import bot_config
+
+# rough fixed cost of one live session handle, clients and graph are shared
+SESSION_BASE_BYTES = 4 * 1024
+
+
+class SessionManager:
+    """
+    LRU + TTL cache of chatbot sessions keyed by user_id.
+
+    Sessions are evicted when idle for longer than `ttl`, when there are more than
+    `max_sessions`, or when the estimated memory of all sessions goes over
+    `memory_budget_mb`. The conversation of an evicted session is spilled to
+    `spill_dir` and restored the next time the user shows up.
+    """
+
+    def __init__(self, factory: Callable, max_sessions: int = None, ttl: float = None,
+                 memory_budget_mb: float = None, spill_dir: str = None):
+        cfg = bot_config["session"]
+        self.factory = factory
+        self.max_sessions = max_sessions if max_sessions is not None else cfg["max_sessions"]
+        self.ttl = ttl if ttl is not None else cfg["ttl"]
+        budget_mb = memory_budget_mb if memory_budget_mb is not None else cfg["memory_budget_mb"]
+        self.memory_budget = int(budget_mb * 1024 * 1024)
+        self.spill_dir = spill_dir or cfg["spill_dir"]
+        os.makedirs(self.spill_dir, exist_ok=True)
+
+        self._sessions: "OrderedDict[str, dict]" = OrderedDict()
+        self._memory = 0
+        self._lock = threading.RLock()
+        self.counters: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0, "spills": 0, "restores": 0}
+
+    def get(self, user_id: str):
+        with self._lock:
+            now = time.monotonic()
+            entry = self._sessions.get(user_id)
+            if entry is not None and now - entry["last_used"] <= self.ttl:
+                self.counters["hits"] += 1
+                self._sessions.move_to_end(user_id)
+                entry["last_used"] = now
+                bot = entry["bot"]
+            else:
+                if entry is not None:
+                    self._evict_one(user_id)
+
+                self.counters["misses"] += 1
+                bot = self.factory(user_id)
+                conversation = self._load_spilled(user_id)
+                if conversation:
+                    bot.import_conversation(conversation)
+                    self.counters["restores"] += 1
+
+                self._sessions[user_id] = {"bot": bot, "last_used": now, "size": SESSION_BASE_BYTES}
+                self._memory += SESSION_BASE_BYTES
+
+        # sizing can read the conversation, don't hold every other request up on it
+        # (it reflects the history up to the previous turn)
+        size = self._estimate_size(bot)
+        with self._lock:
+            entry = self._sessions.get(user_id)
+            if entry is not None and entry["bot"] is bot:
+                self._memory += size - entry["size"]
+                entry["size"] = size
+            self._evict(now, keep=user_id)
+        return bot
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "sessions": len(self._sessions),
+                "estimated_memory_bytes": self._memory,
+                "memory_budget_bytes": self.memory_budget,
+            }
+
+    def _evict(self, now: float, keep: str):
+        # expired first, then least recently used until we are under both limits
+        for user_id in [u for u, e in self._sessions.items() if now - e["last_used"] > self.ttl and u != keep]:
+            self._evict_one(user_id)
+
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions or self._memory > self.memory_budget
+        ):
+            user_id = next(iter(self._sessions))
+            if user_id == keep:
+                break
+            self._evict_one(user_id)
+
+    def _evict_one(self, user_id: str):
+        entry = self._sessions.pop(user_id)
+        self._memory -= entry["size"]
+        self.counters["evictions"] += 1
+        try:
+            conversation = entry["bot"].export_conversation()
+            if conversation:
+                self._spill(user_id, conversation)
+        except Exception as e:
+            print(f"Session spill error for {user_id}: {str(e)}")
+        entry["bot"].release()
+
+    def _spill_path(self, user_id: str) -> str:
+        safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", user_id)
+        return os.path.join(self.spill_dir, f"{safe_id}.json")
+
+    def _spill(self, user_id: str, conversation: dict):
+        path = self._spill_path(user_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(conversation, file)
+        os.replace(tmp_path, path)
+        self.counters["spills"] += 1
+
+    def _load_spilled(self, user_id: str) -> dict:
+        path = self._spill_path(user_id)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r") as file:
+            conversation = json.load(file)
+        os.remove(path)
+        return conversation
+
+    def _estimate_size(self, bot) -> int:
+        return SESSION_BASE_BYTES + bot.history_size()
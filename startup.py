@@ -0,0 +1,71 @@
+# fast start: the web modules import without langchain/langgraph/groq, those are loaded here
+# (or by the first request that needs them) once the server is listening
+import os
+import threading
+import time
+
+from config import bot_config
+
+_preloaded = False
+_warmed_pid = None
+_warm_lock = threading.Lock()
+
+
+def preload():
+    """
+    Heavy imports and the lazy parts of the groq client, nothing that holds a
+    connection, file or thread. Safe in a gunicorn --preload master before it
+    forks, the workers then share these pages copy-on-write.
+    """
+    global _preloaded
+    if _preloaded:
+        return
+    start = time.perf_counter()
+    import chatbot
+    import requests # weather provider
+    from langchain_groq import ChatGroq
+
+    chatbot.get_tool_router()
+    # the first ChatGroq built in a process pays for the SDK's lazy imports and pydantic schemas,
+    # build a throwaway one (own http client, never used) so the real ones are cheap
+    ChatGroq(model=bot_config["model"]["core_llm"]["name"], api_key="preload")
+    _preloaded = True
+    print(f"Preloaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def warm_up():
+    """preload() plus everything a process creates for its first chat: storage, user index, clients, graph."""
+    global _warmed_pid
+    with _warm_lock:
+        if _warmed_pid == os.getpid():
+            return
+        start = time.perf_counter()
+        preload()
+        import chatbot
+        from user_index import get_user_index
+        from weather import get_weather_provider
+
+        get_weather_provider()
+        for name in bot_config["model"]:
+            chatbot.get_llm(name)
+        chatbot.get_chat_app()
+        chatbot.get_user_context_cache()
+        chatbot.get_extraction_scheduler()
+        # last, it reads every stored user
+        get_user_index()
+        _warmed_pid = os.getpid()
+        print(f"Warmed up in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def start_warm_up():
+    """warm_up() on a daemon thread, requests arriving meanwhile load what they need themselves."""
+    if not bot_config["startup"]["warm_up"] or _warmed_pid == os.getpid():
+        return
+
+    def run():
+        try:
+            warm_up()
+        except Exception as e:
+            print(f"Warm-up error: {str(e)}")
+
+    threading.Thread(target=run, name="warm-up", daemon=True).start()
@@ -0,0 +1,336 @@
+# personal info storage backends
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from config import bot_config
+import telemetry
+
+
+# original backend, kept for small/dev setups and as the migration source
+class LocalJSONStorage:
+    def __init__(self, file_path="personal_info.json"):
+        self.file_path = file_path
+        self._versions: Dict[str, int] = {} # bumped on every write, see get_version
+        self._listeners: List[Callable] = []
+        if not os.path.exists(file_path):
+            with open(file_path, "w") as file:
+                json.dump({}, file)
+
+    def save_personal_info(self, user_id: str, info_type: str, info: str):
+        # Load existing data
+        with open(self.file_path, "r") as file:
+            data = json.load(file)
+
+        # update the data
+        if user_id not in data:
+            data[user_id] = {}
+        if info_type not in data[user_id]:
+            data[user_id][info_type] = []
+
+        # no duplicates
+        if info not in data[user_id][info_type]:
+            data[user_id][info_type].append(info)
+
+        with open(self.file_path, "w") as file:
+            json.dump(data, file, indent=4)
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        _notify(self._listeners, [(user_id, info_type, info)])
+
+    def save_many(self, entries: List[Tuple[str, str, str]]):
+        # one read and one write for the whole batch
+        with open(self.file_path, "r") as file:
+            data = json.load(file)
+
+        for user_id, info_type, info in entries:
+            values = data.setdefault(user_id, {}).setdefault(info_type, [])
+            if info not in values:
+                values.append(info)
+
+        with open(self.file_path, "w") as file:
+            json.dump(data, file, indent=4)
+        for user_id in {entry[0] for entry in entries}:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        _notify(self._listeners, entries)
+
+    def add_listener(self, listener: Callable):
+        """listener(entries) is called with the (user_id, info_type, info) entries of every write."""
+        self._listeners.append(listener)
+
+    def user_directory(self, after_seq: int = 0):
+        """([(user_id, first name or None, last write time)], seq), seq None: no incremental reads, use add_listener."""
+        with open(self.file_path, "r") as file:
+            data = json.load(file)
+        mtime = os.path.getmtime(self.file_path)
+        return [(user_id, (facts.get("name") or [None])[0], mtime) for user_id, facts in data.items()], None
+
+    def get_version(self, user_id: str) -> int:
+        # changes whenever this process writes facts for the user
+        return self._versions.get(user_id, 0)
+
+
+    def load_personal_info(self, user_id: str, info_type: str = None):
+        # Load existing data
+        with open(self.file_path, "r") as file:
+            data = json.load(file)
+
+        if info_type == "all":
+            return data.get(user_id, {})
+
+        # Retrieve the user's data
+        if user_id not in data:
+            return None
+        if info_type:
+            return data[user_id].get(info_type, [])
+        return data[user_id]
+
+    def get_all_users(self):
+        with open(self.file_path, "r") as file:
+            data = json.load(file)
+        return list(data.keys())
+
+
+class SQLiteStorage:
+    """
+    Append-only personal info store on SQLite (WAL mode).
+
+    Every fact is one row, indexed by (user_id, info_type), so a write or a
+    per-user read costs O(log n) instead of a full file rewrite/parse.
+    Writes are buffered and committed in batches; reads flush the buffer first
+    so the calling process always sees its own writes. WAL + busy_timeout makes
+    it safe for several threads and gunicorn workers to write at once.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS personal_info (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        info_type TEXT NOT NULL,
+        info TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        UNIQUE (user_id, info_type, info)
+    );
+    CREATE INDEX IF NOT EXISTS personal_info_user_seq ON personal_info (user_id, seq);
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, file_path="personal_info.db", batch_size: int = 32, flush_interval: float = 0.5):
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, str, str, float]] = []
+        self._listeners: List[Callable] = []
+
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+        conn.commit()
+
+        # flush whatever is left in the buffer periodically and on shutdown
+        self._stop = threading.Event()
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite connections can't be shared between threads, keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.file_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Storage flush error: {str(e)}")
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            conn = self._conn()
+            with telemetry.span("storage_write"), conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO personal_info (user_id, info_type, info, created_at) VALUES (?, ?, ?, ?)",
+                    batch,
+                )
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    def save_personal_info(self, user_id: str, info_type: str, info: str):
+        self.save_many([(user_id, info_type, info)])
+
+    def save_many(self, entries: List[Tuple[str, str, str]]):
+        now = time.time()
+        with self._lock:
+            self._pending.extend((user_id, info_type, info, now) for user_id, info_type, info in entries)
+            full = len(self._pending) >= self.batch_size
+        _notify(self._listeners, entries)
+        if full:
+            self.flush()
+
+    def add_listener(self, listener: Callable):
+        """listener(entries) is called with the (user_id, info_type, info) entries of every write, before they are flushed."""
+        self._listeners.append(listener)
+
+    def user_directory(self, after_seq: int = 0):
+        """
+        ([(user_id, first name or None, last write time)], seq) for users with facts written
+        after `after_seq`, seq is the newest one to pass next time (other workers' writes).
+        """
+        self.flush()
+        conn = self._conn()
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM personal_info").fetchone()[0]
+        names: Dict[str, str] = {}
+        for user_id, info in conn.execute(
+            "SELECT user_id, info FROM personal_info WHERE info_type = 'name' AND seq > ? AND seq <= ? ORDER BY seq",
+            (after_seq, seq),
+        ):
+            names.setdefault(user_id, info)
+        rows = conn.execute(
+            "SELECT user_id, MAX(created_at) FROM personal_info WHERE seq > ? AND seq <= ? GROUP BY user_id",
+            (after_seq, seq),
+        )
+        return [(user_id, names.get(user_id), last_write) for user_id, last_write in rows], seq
+
+    def load_personal_info(self, user_id: str, info_type: str = None):
+        with telemetry.span("storage_read"):
+            return self._load_personal_info(user_id, info_type)
+
+    def _load_personal_info(self, user_id: str, info_type: str = None):
+        self.flush()
+        conn = self._conn()
+
+        if info_type and info_type != "all":
+            rows = conn.execute(
+                "SELECT info FROM personal_info WHERE user_id = ? AND info_type = ? ORDER BY seq",
+                (user_id, info_type),
+            ).fetchall()
+            if not rows and not self.has_user(user_id):
+                return None
+            return [row[0] for row in rows]
+
+        rows = conn.execute(
+            "SELECT info_type, info FROM personal_info WHERE user_id = ? ORDER BY seq",
+            (user_id,),
+        ).fetchall()
+        data: Dict[str, List[str]] = {}
+        for row_type, info in rows:
+            data.setdefault(row_type, []).append(info)
+
+        if info_type == "all":
+            return data
+        return data or None
+
+    def get_version(self, user_id: str) -> int:
+        # seq of the user's newest fact: grows with every write, from any worker, one index lookup
+        self.flush()
+        row = self._conn().execute(
+            "SELECT MAX(seq) FROM personal_info WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return row[0] or 0
+
+    def has_user(self, user_id: str) -> bool:
+        self.flush()
+        row = self._conn().execute(
+            "SELECT 1 FROM personal_info WHERE user_id = ? LIMIT 1", (user_id,)
+        ).fetchone()
+        return row is not None
+
+    def get_all_users(self):
+        self.flush()
+        rows = self._conn().execute("SELECT DISTINCT user_id FROM personal_info ORDER BY user_id").fetchall()
+        return [row[0] for row in rows]
+
+
+def _notify(listeners: List[Callable], entries: List[Tuple[str, str, str]]):
+    for listener in listeners:
+        try:
+            listener(entries)
+        except Exception as e:
+            print(f"Storage listener error: {str(e)}")
+
+
+def migrate_json_to_sqlite(json_path: str, storage: SQLiteStorage, force: bool = False) -> int:
+    """
+    Copy every fact from a LocalJSONStorage file into `storage`, returns the number of facts copied.
+    The copy and its "done" marker are one transaction, so a crash leaves the migration to the next
+    start and workers starting together run it once. 0 if it was already done, unless `force`.
+    """
+    with open(json_path, "r") as file:
+        data = json.load(file)
+
+    now = time.time()
+    entries = []
+    for user_id, user_data in data.items():
+        for info_type, values in user_data.items():
+            if not isinstance(values, list):
+                values = [values]
+            entries.extend((user_id, info_type, str(value)) for value in values)
+
+    conn = storage._conn()
+    conn.execute("BEGIN IMMEDIATE") # other workers wait here, then see the marker
+    try:
+        if not force and conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            conn.rollback()
+            return 0
+        conn.executemany(
+            "INSERT OR IGNORE INTO personal_info (user_id, info_type, info, created_at) VALUES (?, ?, ?, ?)",
+            [entry + (now,) for entry in entries],
+        )
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (json_path,))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    _notify(storage._listeners, entries)
+    return len(entries)
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+def get_storage():
+    """Process wide storage instance picked from bot_config["storage"]."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            cfg = bot_config["storage"]
+            if cfg["backend"] == "json":
+                _storage = LocalJSONStorage(cfg["json_path"])
+            else:
+                _storage = SQLiteStorage(cfg["path"], batch_size=cfg["batch_size"], flush_interval=cfg["flush_interval"])
+                # bring over the old json data, once: the db records when that's done
+                if os.path.exists(cfg["json_path"]):
+                    count = migrate_json_to_sqlite(cfg["json_path"], _storage)
+                    if count:
+                        print(f"Migrated {count} entries from {cfg['json_path']} to {cfg['path']}")
+        return _storage
+
+
+if __name__ == "__main__":
+    # python storage.py <personal_info.json> <personal_info.db>
+    import sys
+    src = sys.argv[1] if len(sys.argv) > 1 else bot_config["storage"]["json_path"]
+    dst = sys.argv[2] if len(sys.argv) > 2 else bot_config["storage"]["path"]
+    count = migrate_json_to_sqlite(src, SQLiteStorage(dst), force=True)
+    print(f"Migrated {count} entries from {src} to {dst}")
@@ -0,0 +1,212 @@
+# per-stage spans, token counters and Prometheus text exposition, no external dependency
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import bot_config
+
+enabled = bot_config["telemetry"]["enabled"]
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_trace: ContextVar[Optional[dict]] = ContextVar("trace", default=None)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _label_text(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines += [f"{self.name}{_label_text(labels)} {value}" for labels, value in self._values.items()]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._values: Dict[Labels, list] = {} # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, data in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, data):
+                    cumulative += count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_label_text(labels, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_label_text(labels, le)} {data[-1]}")
+                lines.append(f"{self.name}_sum{_label_text(labels)} {data[-2]}")
+                lines.append(f"{self.name}_count{_label_text(labels)} {data[-1]}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("chatbot_stage_seconds", "Time spent in each stage of a chat turn")
+REQUEST_SECONDS = Histogram("chatbot_request_seconds", "HTTP request latency by path")
+TOKENS = Counter("chatbot_llm_tokens_total", "Prompt and completion tokens reported by the model")
+LLM_CALLS = Counter("chatbot_llm_calls_total", "Model calls by stage")
+
+_metrics = [STAGE_SECONDS, REQUEST_SECONDS, TOKENS, LLM_CALLS]
+_gauges: Dict[str, Tuple[str, List[Callable[[], Dict[Labels, float]]]]] = {}
+
+
+def register_gauge(name: str, help: str, collect: Callable[[], Dict[Labels, float]]):
+    """
+    `collect` is called on every scrape and returns {labels: value}, for queue depths,
+    cache stats etc. Several modules can register collectors under the same name.
+    """
+    _gauges.setdefault(name, (help, []))[1].append(collect)
+
+
+def stats_collector(stats: Callable[[], Optional[dict]], keys, **labels) -> Callable[[], Dict[Labels, float]]:
+    """Collector reading `keys` of a stats() dict, e.g. stats_collector(cache.stats, ["hits", "misses"], cache="weather")."""
+    def collect():
+        values = stats() or {}
+        return {tuple(sorted({**labels, "result": key}.items())): values[key] for key in keys if key in values}
+    return collect
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, stage=self.stage)
+        trace = _trace.get()
+        if trace is not None:
+            trace["spans"].append((self.stage, elapsed))
+        return False
+
+
+def span(stage: str):
+    """with span("model"): ... times the block into chatbot_stage_seconds and the current trace."""
+    return _Span(stage) if enabled else _NOOP
+
+
+def record_tokens(stage: str, message):
+    # usage_metadata is set by ChatGroq (and most chat models), fakes may not have it
+    if not enabled:
+        return
+    LLM_CALLS.inc(stage=stage)
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return
+    TOKENS.inc(usage.get("input_tokens", 0), stage=stage, kind="prompt")
+    TOKENS.inc(usage.get("output_tokens", 0), stage=stage, kind="completion")
+    trace = _trace.get()
+    if trace is not None:
+        trace["tokens"] += usage.get("total_tokens", 0)
+
+
+def annotate(**attributes):
+    """Attach attributes (cache_hit, tool, ...) to the current trace."""
+    if not enabled:
+        return
+    trace = _trace.get()
+    if trace is not None:
+        trace["attributes"].update(attributes)
+
+
+def start_trace(trace_id: str = None):
+    """Begin a request trace, returns (trace_id, token) for end_trace."""
+    if not enabled:
+        return trace_id or "", None
+    trace = {"id": trace_id or uuid.uuid4().hex, "start": time.perf_counter(), "spans": [], "tokens": 0, "attributes": {}}
+    return trace["id"], _trace.set(trace)
+
+
+def end_trace(token, path: str = "") -> Optional[dict]:
+    if token is None:
+        return None
+    trace = _trace.get()
+    try:
+        _trace.reset(token)
+    except ValueError:
+        # ended from another context (e.g. a streamed response finishing on another thread)
+        _trace.set(None)
+    if trace is None:
+        return None
+    trace["seconds"] = time.perf_counter() - trace["start"]
+    if path:
+        REQUEST_SECONDS.observe(trace["seconds"], path=path)
+    if bot_config["telemetry"]["log_traces"]:
+        stages = ", ".join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in trace["spans"])
+        print(f"trace {trace['id']} {path} {trace['seconds'] * 1000:.1f}ms tokens={trace['tokens']} {trace['attributes']} [{stages}]")
+    return trace
+
+
+def current_trace_id() -> str:
+    trace = _trace.get()
+    return trace["id"] if trace is not None else ""
+
+
+def render() -> str:
+    """All metrics in the Prometheus text format."""
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+    for name, (help, collectors) in _gauges.items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        for collect in collectors:
+            try:
+                values = collect()
+            except Exception as e:
+                print(f"Metrics collect error for {name}: {str(e)}")
+                continue
+            lines += [f"{name}{_label_text(labels)} {value}" for labels, value in values.items()]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,258 @@
+# tools the chatbot can call, one registry per process shared by all sessions.
+# Tools are added with the @registry.tool decorator or by installed packages through the
+# "chatbot.tools" entry point group (pointing at a Tool, or at a module that uses the decorator).
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime
+from importlib.metadata import entry_points
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from config import bot_config
+import telemetry
+from weather import WeatherUnavailable, get_weather_provider, worst_case_seconds
+
+ENTRY_POINT_GROUP = "chatbot.tools"
+
+
+#tools to be used deterministic
+class ToolParameter(BaseModel):
+    name: str
+    description: str
+    required: bool = False
+    default: Optional[Any] = None
+
+class Tool(BaseModel):
+    name: str
+    description: str
+    parameters: List[ToolParameter]
+    examples: List[str]
+    func: Optional[Callable[..., str]] = Field(default=None, exclude=True)
+    timeout: Optional[float] = None # seconds before the call is given up, bot_config["tools"]["timeout"] if None
+    cache_ttl: float = 0 # seconds a result may be reused for the same params, 0 never
+    patterns: List[str] = [] # phrasings that clearly ask for the tool, for the local intent router
+    keywords: Optional[str] = None # regex of words without which the tool is never needed
+    extract_params: Optional[Callable[[str], dict]] = Field(default=None, exclude=True) # message -> params, for the local router
+
+
+class ToolRegistry(dict):
+    """name -> Tool. `version` goes up with every registration, so derived routers can be rebuilt."""
+
+    def __init__(self):
+        super().__init__()
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def register(self, tool: Tool) -> Tool:
+        with self._lock:
+            self[tool.name] = tool
+            self.version += 1
+        return tool
+
+    def tool(self, name: str, description: str, parameters: List[ToolParameter] = (), examples: List[str] = (), **options):
+        """Decorator registering a function returning the tool's answer as text, e.g.
+
+        @registry.tool("stock", "Latest price of a stock", [ToolParameter(name="symbol", ...)], timeout=3, cache_ttl=60)
+        def stock(symbol: str) -> str: ...
+        """
+        def decorator(func: Callable[..., str]) -> Callable[..., str]:
+            self.register(Tool(
+                name=name, description=description, parameters=list(parameters), examples=list(examples), func=func, **options,
+            ))
+            return func
+        return decorator
+
+    def load_entry_points(self, group: str = ENTRY_POINT_GROUP):
+        for entry_point in entry_points(group=group):
+            try:
+                loaded = entry_point.load() # importing a module registers its decorated tools
+            except Exception as e:
+                print(f"Tool plugin {entry_point.name} failed to load: {str(e)}")
+                continue
+            if isinstance(loaded, Tool):
+                self.register(loaded)
+
+
+registry = ToolRegistry()
+
+# results of tools with a cache_ttl, (name, params) -> (expires_at, answer)
+_results: Dict[tuple, tuple] = {}
+_results_lock = threading.Lock()
+# one executor per tool, a tool whose calls hang (and keep their threads) only holds up its own calls
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executor_lock = threading.Lock()
+
+def _get_executor(tool: Tool) -> ThreadPoolExecutor:
+    with _executor_lock:
+        if tool.name not in _executors:
+            _executors[tool.name] = ThreadPoolExecutor(
+                max_workers=bot_config["tools"]["max_workers"], thread_name_prefix=f"tool-{tool.name}",
+            )
+        return _executors[tool.name]
+
+
+class _Start:
+    """Called by the worker thread when a call starts running, its timeout counts from then."""
+
+    def __init__(self, then: Callable[[], None] = None):
+        self.at = None
+        self.event = threading.Event()
+        self.then = then
+
+    def __call__(self):
+        self.at = time.monotonic()
+        self.event.set()
+        if self.then is not None:
+            try:
+                self.then()
+            except RuntimeError: # event loop already closed, nobody is waiting for this call anymore
+                pass
+
+
+def _call_key(tool: Tool, params: dict) -> tuple:
+    return (tool.name, tuple(sorted((key, str(value)) for key, value in params.items())))
+
+
+def _params_for(tool: Tool, params: dict) -> dict:
+    valid_params = {}
+    for param in tool.parameters:
+        if param.name in params:
+            valid_params[param.name] = params[param.name]
+        elif param.default is not None:
+            valid_params[param.name] = param.default
+    return valid_params
+
+
+def _cached(tool: Tool, params: dict) -> Optional[str]:
+    if not tool.cache_ttl:
+        return None
+    with _results_lock:
+        entry = _results.get(_call_key(tool, params))
+    return entry[1] if entry is not None and entry[0] > time.monotonic() else None
+
+
+def _run(tool: Tool, params: dict, start: _Start = None) -> str:
+    if start is not None:
+        start()
+    try:
+        with telemetry.span("tool"):
+            result = tool.func(**params)
+    except Exception as e:
+        print(f"Tool execution error: {str(e)}")
+        return f"Sorry, I encountered an error while using the {tool.name} tool."
+    if tool.cache_ttl:
+        with _results_lock:
+            _results[_call_key(tool, params)] = (time.monotonic() + tool.cache_ttl, result)
+    return result
+
+
+def _prepare(calls: List[dict]) -> list:
+    # (tool, params, cached answer or error) per call
+    prepared = []
+    for call in calls:
+        tool = registry.get(call["tool"])
+        if tool is None or tool.func is None:
+            prepared.append((None, {}, f"Tool '{call['tool']}' not found."))
+            continue
+        params = _params_for(tool, call.get("params", {}))
+        prepared.append((tool, params, _cached(tool, params)))
+    telemetry.annotate(tools=[call["tool"] for call in calls])
+    return prepared
+
+
+def _timeout(tool: Tool) -> float:
+    return tool.timeout if tool.timeout is not None else bot_config["tools"]["timeout"]
+
+
+def _too_slow(tool: Tool) -> str:
+    print(f"Tool {tool.name} timed out after {_timeout(tool)}s")
+    return f"Sorry, the {tool.name} tool took too long to answer."
+
+
+def run_tools(calls: List[dict]) -> List[str]:
+    """
+    Run [{"tool", "params"}] in parallel, one answer per call, in order. Each call gets its
+    tool's timeout from when it starts running, and as long again to get a free thread.
+    """
+    prepared = _prepare(calls)
+    submitted = time.monotonic()
+    starts = [_Start() for _ in prepared]
+    futures = [None if answer is not None else _get_executor(tool).submit(_run, tool, params, start)
+               for (tool, params, answer), start in zip(prepared, starts)]
+    answers = []
+    for (tool, params, answer), start, future in zip(prepared, starts, futures):
+        if future is None:
+            answers.append(answer)
+            continue
+        timeout = _timeout(tool)
+        try:
+            if not start.event.wait(max(0.0, submitted + timeout - time.monotonic())):
+                raise FutureTimeout
+            answers.append(future.result(timeout=max(0.0, start.at + timeout - time.monotonic())))
+        except FutureTimeout:
+            # a running thread can't be stopped, its result is dropped
+            future.cancel()
+            answers.append(_too_slow(tool))
+    return answers
+
+
+async def arun_tools(calls: List[dict]) -> List[str]:
+    """Async run_tools, the calls still run on the tools' executors."""
+    loop = asyncio.get_running_loop()
+
+    async def run(tool: Tool, params: dict, answer: Optional[str]) -> str:
+        if answer is not None:
+            return answer
+        timeout = _timeout(tool)
+        started = asyncio.Event()
+        start = _Start(lambda: loop.call_soon_threadsafe(started.set))
+        future = loop.run_in_executor(_get_executor(tool), _run, tool, params, start)
+        try:
+            await asyncio.wait_for(started.wait(), timeout)
+            return await asyncio.wait_for(future, max(0.0, start.at + timeout - time.monotonic()))
+        except asyncio.TimeoutError:
+            future.cancel()
+            return _too_slow(tool)
+
+    return list(await asyncio.gather(*(run(*call) for call in _prepare(calls))))
+
+
+# built-in tools
+@registry.tool(
+    "weather", "Get current weather information for a location",
+    parameters=[ToolParameter(name="city", description="The city name to get weather for", required=True)],
+    examples=["What's the weather in London?", "How's the weather today in New York?", "Tell me the weather in Tokyo"],
+    # weather.py caches per city, retries and has a circuit breaker, give it time for all its attempts
+    timeout=worst_case_seconds(
+        bot_config["weather"]["timeout"], bot_config["weather"]["retries"], bot_config["weather"]["backoff"],
+    ) + 1,
+)
+def get_weather(city: str = None) -> str:
+    if not city:
+        return "Sorry, I need a city to fetch the weather for."
+    try:
+        print(f"Fetching weather for {city}")
+        data = get_weather_provider().current(city)
+        day_time = "day" if data["is_day"] else "night"
+        return f"The temperature in {city} is {data['temp_c']}°C. It is {day_time} time and the weather condition is {data['condition']}."
+    except WeatherUnavailable as e:
+        print(f"Weather API error: {str(e)}")
+        return f"Sorry, I couldn't fetch the weather for {city}."
+
+
+@registry.tool(
+    "time", "Get the current time",
+    examples=["What time is it?", "Tell me the current time", "What's the time now?"],
+    timeout=1,
+)
+def get_current_time() -> str:
+    now = datetime.now()
+    current_time = now.strftime("%H:%M:%S")
+    return f"The current time is {current_time}."
+
+
+if bot_config["tools"]["entry_points"]:
+    registry.load_entry_points()
@@ -0,0 +1,114 @@
+# in-memory user directory (user_id -> display name, last seen) so /greet needs no storage read
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import bot_config
+import telemetry
+from storage import get_storage
+
+DEFAULT_GREETING = "Hello! How can I help you today?"
+
+
+class UserIndex:
+    """
+    Display name and last seen time of every user, loaded once from storage.
+
+    Writes made by this process arrive through a storage listener. Writes made by
+    other workers are picked up by an incremental read (facts newer than the last
+    seen seq) at most every `refresh_interval` seconds, on the SQLite backend.
+    """
+
+    def __init__(self, storage, refresh_interval: float = 5.0):
+        self.storage = storage
+        self.refresh_interval = refresh_interval
+        self._names: Dict[str, str] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._seq: Optional[int] = 0
+        self._refreshed_at = 0.0
+
+        start = time.perf_counter()
+        storage.add_listener(self._on_write)
+        self._refresh()
+        self.load_seconds = time.perf_counter() - start
+
+    def _refresh(self):
+        rows, seq = self.storage.user_directory(self._seq or 0)
+        with self._lock:
+            for user_id, name, last_write in rows:
+                if name and user_id not in self._names:
+                    self._names[user_id] = sys.intern(name) # a few thousand distinct names for millions of users
+                if last_write > self._last_seen.get(user_id, 0.0):
+                    self._last_seen[user_id] = last_write
+            self._seq = seq
+            self._refreshed_at = time.monotonic()
+
+    def _on_write(self, entries: List[Tuple[str, str, str]]):
+        now = time.time()
+        with self._lock:
+            for user_id, info_type, info in entries:
+                if info_type == "name" and user_id not in self._names:
+                    self._names[user_id] = sys.intern(info)
+                self._last_seen[user_id] = now
+
+    def _maybe_refresh(self):
+        if self._seq is None or time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        try:
+            self._refresh()
+        except Exception as e:
+            print(f"User index refresh error: {str(e)}")
+            self._refreshed_at = time.monotonic()
+
+    def touch(self, user_id: str):
+        """Record that a known user was just seen (a greeting or a chat turn)."""
+        with self._lock:
+            # only users storage knows about, random ids hitting /greet mustn't grow the index
+            if user_id in self._last_seen:
+                self._last_seen[user_id] = time.time()
+
+    def get(self, user_id: str) -> Optional[dict]:
+        """{"name", "last_seen"} for a known user, None otherwise."""
+        self._maybe_refresh()
+        with self._lock:
+            last_seen = self._last_seen.get(user_id)
+            if last_seen is None:
+                return None
+            return {"name": self._names.get(user_id), "last_seen": last_seen}
+
+    def greeting(self, user_id: str) -> str:
+        with telemetry.span("greet"):
+            user = self.get(user_id)
+            self.touch(user_id)
+        if user is None or not user["name"]:
+            return DEFAULT_GREETING
+        return f"Hello {user['name']}! How can I help you today?"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._last_seen),
+                "named": len(self._names),
+                "seq": self._seq,
+                "load_ms": round(self.load_seconds * 1000, 1),
+            }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_user_index() -> UserIndex:
+    """Process wide index over get_storage(), loaded on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = UserIndex(get_storage(), bot_config["user_index"]["refresh_interval"])
+        return _index
+
+
+telemetry.register_gauge(
+    "chatbot_users", "Users in the in-memory user index",
+    lambda: {(("kind", key),): value for key, value in _index.stats().items() if key in ("users", "named")} if _index else {},
+)
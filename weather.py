@@ -0,0 +1,251 @@
+# weather providers: weatherapi.com client, offline stub, and a caching/coalescing wrapper
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from config import bot_config
+import telemetry
+
+
+class WeatherUnavailable(Exception):
+    pass
+
+
+class WeatherProvider:
+    # current(city) -> {"temp_c": float, "is_day": bool, "condition": str}
+    def current(self, city: str) -> dict:
+        raise NotImplementedError
+
+
+class WeatherAPIProvider(WeatherProvider):
+    """weatherapi.com over one pooled session, with timeouts and retry/backoff."""
+
+    url = "http://api.weatherapi.com/v1"
+
+    def __init__(self, api_key: str = None, timeout: float = 5, retries: int = 2, backoff: float = 0.3, pool_size: int = 20):
+        self.api_key = api_key or os.getenv("WEATHER_API_KEY")
+        self.url = os.getenv("WEATHER_API_URL", self.url) # e.g. benchmarks/stub_server.py
+        self.timeout = timeout
+        # requests/urllib3 take ~70 ms to import, only this provider needs them
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self._errors = (requests.RequestException, KeyError, ValueError)
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+            respect_retry_after_header=False, # a Retry-After could sleep past worst_case_seconds()
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def current(self, city: str) -> dict:
+        try:
+            response = self.session.get(
+                f"{self.url}/current.json",
+                params={"key": self.api_key, "q": city},
+                timeout=self.timeout,
+            )
+            response.raise_for_status() # Raise exception for bad status codes
+            data = response.json()
+            return {
+                "temp_c": data['current']['temp_c'],
+                "is_day": data['current']['is_day'] != 0,
+                "condition": data['current']['condition']['text'],
+            }
+        except self._errors as e:
+            raise WeatherUnavailable(str(e)) from e
+
+
+def worst_case_seconds(timeout: float, retries: int, backoff: float) -> float:
+    """Longest a WeatherAPIProvider lookup can take: every attempt hitting its connect and read timeouts, plus the backoff sleeps."""
+    # urllib3 sleeps backoff * 2 ** (n - 1) before the n-th retry, nothing before the first
+    sleeps = sum(backoff * 2 ** (n - 1) for n in range(2, retries + 1))
+    return 2 * timeout * (retries + 1) + sleeps
+
+
+class StubWeatherProvider(WeatherProvider):
+    """Offline provider with stable fake readings per city, for tests and load runs."""
+
+    conditions = ["Sunny", "Partly cloudy", "Overcast", "Light rain", "Clear", "Mist"]
+
+    def __init__(self, latency: float = 0.0, fail: bool = False):
+        self.latency = latency
+        self.fail = fail
+
+    def current(self, city: str) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail:
+            raise WeatherUnavailable("stub provider set to fail")
+        digest = int(hashlib.md5(city.lower().encode()).hexdigest(), 16)
+        return {
+            "temp_c": round(-5 + (digest % 400) / 10, 1),
+            "is_day": digest % 2 == 0,
+            "condition": self.conditions[digest % len(self.conditions)],
+        }
+
+
+class CachedWeatherProvider(WeatherProvider):
+    """
+    Per-city TTL cache in front of another provider.
+
+    Concurrent lookups of the same city share one upstream call (single flight).
+    After `breaker_failures` consecutive upstream errors the circuit opens for
+    `breaker_reset` seconds; while open, or when a call fails, the last known
+    reading (up to `stale_ttl` old) is served instead.
+    """
+
+    def __init__(self, provider: WeatherProvider, ttl: float = 600, stale_ttl: float = 3600,
+                 breaker_failures: int = 5, breaker_reset: float = 30):
+        self.provider = provider
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+
+        self._cache: Dict[str, tuple] = {} # key -> (reading, fetched_at)
+        self._in_flight: Dict[str, dict] = {} # key -> {"event", "result", "error"}
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+
+        self.counters = {
+            "hits": 0, "misses": 0, "coalesced": 0, "stale_served": 0,
+            "upstream_calls": 0, "upstream_errors": 0, "breaker_opened": 0,
+        }
+        self.upstream_seconds = 0.0
+
+    def current(self, city: str) -> dict:
+        key = " ".join(city.lower().split())
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and now - cached[1] <= self.ttl:
+                self.counters["hits"] += 1
+                return cached[0]
+            self.counters["misses"] += 1
+
+            if self._breaker_open(now):
+                return self._stale_or_raise(key, now, WeatherUnavailable("circuit open"))
+
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = {"event": threading.Event(), "result": None, "error": None}
+                self._in_flight[key] = flight
+            else:
+                self.counters["coalesced"] += 1
+
+        if not leader:
+            flight["event"].wait()
+            if flight["error"] is not None:
+                with self._lock:
+                    return self._stale_or_raise(key, time.monotonic(), flight["error"])
+            return flight["result"]
+
+        start = time.perf_counter()
+        try:
+            with telemetry.span("weather_upstream"):
+                result = self.provider.current(city)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.counters["upstream_calls"] += 1
+                self.upstream_seconds += elapsed
+                self._cache[key] = (result, time.monotonic())
+                self._failures = 0
+                self._opened_at = None
+            flight["result"] = result
+            return result
+        except WeatherUnavailable as e:
+            flight["error"] = e
+            with self._lock:
+                self.counters["upstream_calls"] += 1
+                self.upstream_seconds += time.perf_counter() - start
+                self.counters["upstream_errors"] += 1
+                self._failures += 1
+                if self._failures >= self.breaker_failures and self._opened_at is None:
+                    self._opened_at = time.monotonic()
+                    self.counters["breaker_opened"] += 1
+                return self._stale_or_raise(key, time.monotonic(), e)
+        except Exception as e:
+            # a provider bug, not an outage: waiters get the same error instead of a None reading
+            flight["error"] = WeatherUnavailable(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight["event"].set()
+
+    def _breaker_open(self, now: float) -> bool:
+        if self._opened_at is None:
+            return False
+        if now - self._opened_at >= self.breaker_reset:
+            # half open: let the next call through, one more failure re-opens it
+            self._opened_at = None
+            self._failures = self.breaker_failures - 1
+            return False
+        return True
+
+    def _stale_or_raise(self, key: str, now: float, error: Exception) -> dict:
+        cached = self._cache.get(key)
+        if cached and now - cached[1] <= self.stale_ttl:
+            self.counters["stale_served"] += 1
+            return cached[0]
+        raise error
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            calls = self.counters["upstream_calls"]
+            return {
+                **self.counters,
+                "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+                "upstream_avg_ms": self.upstream_seconds / calls * 1000 if calls else 0.0,
+                "breaker_open": self._opened_at is not None,
+                "cached_cities": len(self._cache),
+            }
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def get_weather_provider() -> CachedWeatherProvider:
+    """Process wide cached provider, backend picked by bot_config["weather"]["provider"]."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            cfg = bot_config["weather"]
+            if cfg["provider"] == "stub":
+                upstream = StubWeatherProvider()
+            else:
+                upstream = WeatherAPIProvider(
+                    timeout=cfg["timeout"], retries=cfg["retries"], backoff=cfg["backoff"], pool_size=cfg["pool_size"],
+                )
+            _provider = CachedWeatherProvider(
+                upstream, ttl=cfg["ttl"], stale_ttl=cfg["stale_ttl"],
+                breaker_failures=cfg["breaker_failures"], breaker_reset=cfg["breaker_reset"],
+            )
+        return _provider
+
+
+telemetry.register_gauge(
+    "chatbot_cache_lookups", "Cache lookups by cache and result",
+    telemetry.stats_collector(lambda: _provider and _provider.stats(), ["hits", "misses", "stale_served", "coalesced"], cache="weather"),
+)
+
+
+def set_weather_provider(provider: WeatherProvider, **cache_options) -> CachedWeatherProvider:
+    """Swap the upstream provider (e.g. StubWeatherProvider for offline runs)."""
+    global _provider
+    with _provider_lock:
+        _provider = CachedWeatherProvider(provider, **cache_options)
+        return _provider
@@ -1,11 +1,53 @@
-from flask import Flask, render_template, request, jsonify
-from chatbot import ChatBotLangchain
+import json
+
+from dotenv import load_dotenv
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
+import telemetry
+import model_router
+from config import bot_config
+from user_index import get_user_index
+from session import SessionManager
+from weather import get_weather_provider
+from response_cache import get_response_cache
+import startup
+
+load_dotenv()
 
 app = Flask(__name__)
 # chatbot = Chatbot()
 # chatbot = ChatBotLangchain()
 
-session_state = {}
+def chatbot_class():
+    # chatbot pulls in langchain, langgraph and groq (~1 s), it's imported by the first chat or by startup.warm_up()
+    from chatbot import ChatBotLangchain
+    return ChatBotLangchain
+
+# one chatbot per user, bounded by bot_config["session"]
+session_state = SessionManager(lambda user_id: chatbot_class()(user_id))
+
+def get_session(user_id: str):
+    get_user_index().touch(user_id)
+    return session_state.get(user_id)
+
+telemetry.register_gauge(
+    "chatbot_sessions", "Live chat sessions and their estimated memory",
+    lambda: {(("kind", key),): value for key, value in session_state.stats().items() if key in ("sessions", "estimated_memory_bytes")},
+)
+
+# every request gets a trace id (the caller's X-Request-ID if given), returned as X-Trace-ID
+@app.before_request
+def start_trace():
+    g.trace_id, g.trace_token = telemetry.start_trace(request.headers.get('X-Request-ID'))
+
+@app.after_request
+def add_trace_header(response):
+    if g.get('trace_id'):
+        response.headers['X-Trace-ID'] = g.trace_id
+    return response
+
+@app.teardown_request
+def end_trace(error=None):
+    telemetry.end_trace(g.pop('trace_token', None), request.path)
 
 @app.route('/')
 def home():
@@ -18,17 +60,68 @@ def chat():
     if not user_id:
         return jsonify({'error': 'User ID is required'}), 400
     
-    if user_id in session_state:
-        chatbot = session_state[user_id]
-    else:
-        chatbot = ChatBotLangchain(user_id)
-        session_state[user_id] = chatbot
+    chatbot = get_session(user_id)
     if not message:
         return jsonify({'error': 'Empty message'}), 400
     
     response = chatbot.get_response(message, user_id)
     return jsonify({'response': response})
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    # same as /chat but the reply is sent as Server-Sent Events, token by token
+    message = request.json.get('message', '')
+    user_id = request.json.get('user_id', '')
+    if not user_id:
+        return jsonify({'error': 'User ID is required'}), 400
+
+    chatbot = get_session(user_id)
+    if not message:
+        return jsonify({'error': 'Empty message'}), 400
+
+    # the trace ends with the stream, not when the view returns
+    trace_token = g.pop('trace_token', None)
+
+    def events():
+        try:
+            for event in chatbot.stream_response(message, user_id):
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            telemetry.end_trace(trace_token, '/chat/stream')
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+def batch_request(data):
+    """(items, max_concurrency) from a /chat/batch body, or an error message."""
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return None, None, 'items must be a non-empty list of {user_id, message}'
+    if len(items) > bot_config['batch']['max_items']:
+        return None, None, f"at most {bot_config['batch']['max_items']} items per batch"
+    limit = bot_config['batch']['max_concurrency']
+    try:
+        max_concurrency = max(1, min(int(data.get('max_concurrency') or limit), limit))
+    except (TypeError, ValueError):
+        return None, None, 'max_concurrency must be a number'
+    return items, max_concurrency, None
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    # many (user_id, message) pairs in one request, one JSON line per answer as they finish
+    items, max_concurrency, error = batch_request(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+
+    def lines():
+        for result in chatbot_class().batch_responses(items, get_session, max_concurrency):
+            yield json.dumps(result) + "\n"
+
+    return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+
 @app.route('/greet', methods=['POST'])
 def greet():
     try:
@@ -36,17 +129,37 @@ def greet():
         if not user_id:
             return jsonify({'error': 'User ID is required'}), 400
 
-        if user_id in session_state:
-            chatbot = session_state[user_id]
-        else:
-            chatbot = ChatBotLangchain(user_id)
-            session_state[user_id] = chatbot
-        response = chatbot.greet(user_id)
-
-        print(response)
+        # no session and no LLM client, the greeting comes from the in-memory user index
+        response = get_user_index().greeting(user_id)
         return jsonify({'response': response})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/sessions/stats', methods=['GET'])
+def session_stats():
+    return jsonify(session_state.stats())
+
+@app.route('/weather/stats', methods=['GET'])
+def weather_stats():
+    return jsonify(get_weather_provider().stats())
+
+@app.route('/users/stats', methods=['GET'])
+def user_stats():
+    return jsonify(get_user_index().stats())
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    cache = get_response_cache()
+    return jsonify(cache.stats() if cache is not None else {'enabled': False})
+
+@app.route('/models/stats', methods=['GET'])
+def model_stats():
+    return jsonify(model_router.usage.stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(telemetry.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
-    app.run()
\ No newline at end of file
+    startup.start_warm_up()
+    app.run()